@@ -2,7 +2,7 @@
 
 let allScenarios = {};
 let categoryScenarios = {};
-let allEvaluations = [];
+let evaluationsByScenario = {};
 
 const DataLoader = {
   loadResponsesIndex() {
@@ -21,18 +21,27 @@ const DataLoader = {
       });
   },
 
-  loadEvaluationsIndex() {
-    console.log('DataLoader: Loading evaluations index...');
-    return fetch('data/evaluations.json')
-      .then(res => res.json())
+  loadEvaluationsForScenario(scenarioId) {
+    if (evaluationsByScenario[scenarioId]) {
+      return Promise.resolve(evaluationsByScenario[scenarioId]);
+    }
+    // Per-scenario shard written by 04_analyze_results.py; older builds only have evaluations.json
+    return fetch(`data/evaluations/${scenarioId}.json`)
+      .then(res => {
+        if (!res.ok) throw new Error('Shard not found');
+        return res.json();
+      })
+      .catch(() => fetch('data/evaluations.json')
+        .then(res => res.json())
+        .then(evaluations => evaluations.filter(e => e.scenario_id === scenarioId)))
       .then(evaluations => {
-        allEvaluations = evaluations;
-        console.log('DataLoader: Evaluations loaded:', evaluations.length, 'evaluations');
+        evaluationsByScenario[scenarioId] = evaluations;
+        console.log('DataLoader: Evaluations loaded for', scenarioId, evaluations.length, 'evaluations');
         return evaluations;
       })
       .catch(error => {
         console.error('DataLoader: Error loading evaluations:', error);
-        throw error;
+        return [];
       });
   },
 
@@ -75,7 +84,8 @@ const DataLoader = {
   },
 
   getEvaluation(scenarioId, model) {
-    return allEvaluations.find(e => e.scenario_id === scenarioId && e.model === model);
+    const evaluations = evaluationsByScenario[scenarioId] || [];
+    return evaluations.find(e => e.model === model);
   },
 
   async loadResponsesForScenario(scenarioId) {
@@ -118,7 +128,10 @@ const DataLoader = {
         .catch(err => ({ error: true, message: 'Response not available' }))
     ];
 
-    const responses = await Promise.all(promises);
+    const [responses] = await Promise.all([
+      Promise.all(promises),
+      this.loadEvaluationsForScenario(scenarioId)
+    ]);
 
     console.log('DataLoader: Responses loaded for', scenarioId, responses.map(r => r.error ? 'error' : 'ok'));
     return responses;
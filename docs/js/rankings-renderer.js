@@ -46,6 +46,8 @@ const RankingsRenderer = {
     'mistral_large': 'Mistral Large'
   },
 
+  modelOrder: ['claude_web_free', 'chatgpt_web_free', 'gemini_web_free', 'grok_4_1_fast', 'mistral_large'],
+
   categoryNames: {
     'career_transitions': 'Career Transitions',
     'relationship_patterns': 'Relationship Patterns',
@@ -80,22 +82,7 @@ const RankingsRenderer = {
 
   async loadCategoryAnalysis() {
     try {
-      const [evaluationsRes, scenariosRes] = await Promise.all([
-        fetch('data/evaluations.json'),
-        fetch('data/scenarios.json')
-      ]);
-
-      const evaluations = await evaluationsRes.json();
-      const scenarios = await scenariosRes.json();
-
-      // Create scenario ID to category mapping
-      const scenarioCategoryMap = {};
-      scenarios.forEach(s => {
-        scenarioCategoryMap[s.id] = s.category;
-      });
-
-      // Calculate category averages
-      const categoryData = this.calculateCategoryAverages(evaluations, scenarioCategoryMap);
+      const categoryData = await this.loadCategoryAggregates();
 
       // Render category analysis
       this.renderCategoryTable(categoryData);
@@ -108,6 +95,54 @@ const RankingsRenderer = {
     }
   },
 
+  async loadCategoryAggregates() {
+    // Precomputed by 04_analyze_results.py: a few KB instead of the full evaluations.json
+    const res = await fetch('data/aggregates.json');
+    if (res.ok) {
+      const aggregates = await res.json();
+      const categoryAverages = {};
+      Object.keys(aggregates.categories).forEach(category => {
+        const models = aggregates.categories[category];
+        categoryAverages[category] = {};
+        this.modelOrder.forEach(model => {
+          categoryAverages[category][model] = models[model] ? models[model].total_score : null;
+        });
+        categoryAverages[category].best = this.bestModel(categoryAverages[category]);
+      });
+      return categoryAverages;
+    }
+
+    // Older data builds: compute from the full evaluations file
+    const [evaluationsRes, scenariosRes] = await Promise.all([
+      fetch('data/evaluations.json'),
+      fetch('data/scenarios.json')
+    ]);
+
+    const evaluations = await evaluationsRes.json();
+    const scenarios = await scenariosRes.json();
+
+    // Create scenario ID to category mapping
+    const scenarioCategoryMap = {};
+    scenarios.forEach(s => {
+      scenarioCategoryMap[s.id] = s.category;
+    });
+
+    return this.calculateCategoryAverages(evaluations, scenarioCategoryMap);
+  },
+
+  bestModel(averages) {
+    let bestModel = null;
+    let bestAvg = -1;
+    this.modelOrder.forEach(model => {
+      const avg = averages[model];
+      if (avg !== null && avg !== undefined && avg > bestAvg) {
+        bestAvg = avg;
+        bestModel = model;
+      }
+    });
+    return bestModel;
+  },
+
   calculateCategoryAverages(evaluations, scenarioCategoryMap) {
     // Group evaluations by category
     const categoryScores = {};
@@ -140,24 +175,17 @@ const RankingsRenderer = {
     const categoryAverages = {};
     Object.keys(categoryScores).forEach(category => {
       categoryAverages[category] = {};
-      let bestModel = null;
-      let bestAvg = -1;
 
-      ['claude_web_free', 'chatgpt_web_free', 'gemini_web_free', 'grok_4_1_fast', 'mistral_large'].forEach(model => {
+      this.modelOrder.forEach(model => {
         const scores = categoryScores[category][model];
         if (scores && scores.length > 0) {
-          const avg = scores.reduce((a, b) => a + b, 0) / scores.length;
-          categoryAverages[category][model] = avg;
-          if (avg > bestAvg) {
-            bestAvg = avg;
-            bestModel = model;
-          }
+          categoryAverages[category][model] = scores.reduce((a, b) => a + b, 0) / scores.length;
         } else {
           categoryAverages[category][model] = null;
         }
       });
 
-      categoryAverages[category].best = bestModel;
+      categoryAverages[category].best = this.bestModel(categoryAverages[category]);
     });
 
     return categoryAverages;
@@ -19,7 +19,9 @@ async def main():
     print("-" * 40)
     
     generator = ScenarioGenerator()
-    scenarios = await generator.generate_scenarios()
+    client = generator.client
+    async with client.batch_context():
+        scenarios = await generator.generate_scenarios()
     generator.save_scenarios(scenarios)
     
     print(f"\n✅ Generated {len(scenarios)} scenarios")
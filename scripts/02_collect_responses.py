@@ -1,9 +1,11 @@
 #!/usr/bin/env python3
 
+import argparse
 import asyncio
 import sys
 import yaml
 from pathlib import Path
+from typing import Optional, Tuple
 
 # Add project root to Python path
 project_root = Path(__file__).parent.parent
@@ -11,6 +13,7 @@ sys.path.insert(0, str(project_root))
 sys.path.insert(0, str(project_root / "src"))
 
 from src.collector import ConversationCollector
+from work_ledger import WorkLedger, parse_shard, spawn_workers
 
 
 def get_model_descriptions():
@@ -21,13 +24,35 @@ def get_model_descriptions():
             for model_name, data in config.get("models", {}).items()}
 
 
-async def main():
+def run_workers(workers: int) -> int:
+    """Seed the work ledger once, then collect with `workers` processes sharing it"""
+    collector = ConversationCollector()
+    ledger = WorkLedger("collect")
+    added = collector.seed_ledger(collector.load_scenarios(), ledger)
+    print(f"🗂️  Work ledger {ledger.path}: {added} new units, {ledger.counts()}")
+    print(f"👷 Starting {workers} collection workers")
+
+    failures = spawn_workers(__file__, sys.argv[1:], workers)
+
+    print(f"\n✅ Workers finished: {ledger.counts()}")
+    if failures:
+        print(f"⚠️  {failures} worker(s) exited with an error")
+    return 1 if failures else 0
+
+
+async def main(
+    concurrent: bool = False,
+    no_cache: bool = False,
+    shard: Optional[Tuple[int, int]] = None,
+    use_ledger: bool = False
+):
     """Main function to collect all model responses"""
     print("=== LLM Reflective Questioning Benchmark ===")
     print("Phase 2: Collecting Model Responses")
     print("-" * 40)
 
     collector = ConversationCollector()
+    client = collector.client
     scenarios = collector.load_scenarios()
 
     model_descriptions = get_model_descriptions()
@@ -41,11 +66,52 @@ async def main():
     print("⏸️  Can resume from where it left off if interrupted")
     print()
 
-    conversations = await collector.collect_all_conversations(scenarios)
+    client.bypass_cache = client.bypass_cache or no_cache
+
+    async with client.batch_context():
+        if use_ledger:
+            ledger = WorkLedger("collect")
+            client.metrics.worker = ledger.worker_id
+            concurrency = collector.max_conversations if concurrent else 1
+            shard_note = f", shard {shard[0] + 1}/{shard[1]}" if shard else ""
+            print(f"🗂️  Claiming units from {ledger.path} as {ledger.worker_id}{shard_note}")
+            results = await collector.collect_with_ledger(scenarios, ledger, shard, concurrency)
+            print(f"\n✅ Worker {ledger.worker_id}: {results['done']} collected, {results['failed']} failed; "
+                  f"ledger {ledger.counts()}")
+        elif concurrent:
+            print("⚡ Concurrent mode: limits from 'concurrency' in config/models.yaml")
+            conversations = await collector.collect_all_conversations_concurrent(scenarios)
+        else:
+            conversations = await collector.collect_all_conversations(scenarios)
 
-    print(f"\n✅ Collected {len(conversations)} conversations")
+    if not use_ledger:
+        print(f"\n✅ Collected {len(conversations)} conversations")
+    stats = client.cache_stats()
+    if stats and not client.bypass_cache:
+        print(f"🗄️  Response cache: {stats['hits']} hits, {stats['misses']} misses")
     print("📁 Responses saved to: data/responses/[model]/")
+    print(f"💵 {client.ledger.run_summary()} (details: python src/usage_ledger.py --run latest)")
+    client.metrics.print_summary()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Collect 3-turn conversations from test models")
+    parser.add_argument("--concurrent", action="store_true",
+                        help="Run many conversations at once, capped per provider")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Bypass the response cache and sample every request fresh")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Collect with this many processes sharing the work ledger")
+    parser.add_argument("--shard", type=parse_shard,
+                        help="I/N: only take shard I of N of the work (e.g. one shard per machine)")
+    parser.add_argument("--worker-process", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.workers > 1 and not args.worker_process:
+        sys.exit(run_workers(args.workers))
+    asyncio.run(main(
+        concurrent=args.concurrent,
+        no_cache=args.no_cache,
+        shard=args.shard,
+        use_ledger=args.worker_process or args.shard is not None
+    ))
@@ -1,9 +1,11 @@
 #!/usr/bin/env python3
 
+import argparse
 import asyncio
 import sys
 import json
 from pathlib import Path
+from typing import Optional, Tuple
 
 # Add project root to Python path
 project_root = Path(__file__).parent.parent
@@ -12,36 +14,121 @@ sys.path.insert(0, str(project_root / "src"))
 
 from evaluator import Judge
 from models import Scenario
+from evaluation_store import EvaluationStore
+from work_ledger import WorkLedger, parse_shard, spawn_workers
 
 
-async def main():
+def load_scenarios():
+    with open("data/scenarios.json", "r") as f:
+        scenarios_data = json.load(f)
+    return [Scenario(**s) for s in scenarios_data]
+
+
+def export_results(store: EvaluationStore):
+    """Refresh the evaluations.json view from the append-only store, unless it is empty"""
+    if len(store) == 0:
+        print("⚠️  No evaluations in data/evaluations.jsonl; data/evaluations.json left unchanged")
+        return
+    exported = store.export_json()
+    print(f"📁 Results saved to: data/evaluations.jsonl ({exported} exported to data/evaluations.json)")
+
+
+def run_workers(workers: int) -> int:
+    """Seed the work ledger once, evaluate with `workers` processes, then export once"""
+    ledger = WorkLedger("evaluate")
+    added = Judge().seed_ledger(load_scenarios(), ledger)
+    print(f"🗂️  Work ledger {ledger.path}: {added} new units, {ledger.counts()}")
+    print(f"👷 Starting {workers} evaluation workers")
+
+    failures = spawn_workers(__file__, sys.argv[1:], workers)
+
+    print(f"\n✅ Workers finished: {ledger.counts()}")
+    # Workers only append to evaluations.jsonl; the JSON view is rebuilt here once
+    export_results(EvaluationStore())
+    if failures:
+        print(f"⚠️  {failures} worker(s) exited with an error")
+    return 1 if failures else 0
+
+
+async def main(
+    no_cache: bool = False,
+    adaptive: bool = None,
+    shard: Optional[Tuple[int, int]] = None,
+    use_ledger: bool = False,
+    export: bool = True
+):
     """Evaluate model responses using DeepSeek"""
     print("=== LLM Reflective Questioning Benchmark ===")
     print("Phase 3: Running Evaluation")
     print("-" * 40)
 
-    judge = Judge()
+    judge = Judge(adaptive=adaptive)
+    client = judge.client
 
-    # Load conversations
-    conversations = judge.load_conversations()
-    print(f"📝 Loaded {len(conversations)} conversations")
+    # Conversations are read lazily while the judge works through them
+    conversations = judge.iter_conversations()
+    print(f"📝 Found {len(conversations)} conversations")
 
     # Load scenarios
-    with open("data/scenarios.json", "r") as f:
-        scenarios_data = json.load(f)
-    scenarios = [Scenario(**s) for s in scenarios_data]
+    scenarios = load_scenarios()
     print(f"📋 Loaded {len(scenarios)} scenarios")
 
     print("⚖️  Evaluating with DeepSeek-V3 judge...")
+    if judge.adaptive:
+        print(f"🎯 Adaptive runs: {judge.min_runs}-{judge.max_runs} per conversation "
+              f"(stop when run totals' standard error <= {judge.tolerance})")
     print("💾 Progress will be saved after each evaluation")
     print("⏸️  Can resume from where it left off if interrupted")
     print()
 
-    evaluations = await judge.evaluate_all_conversations(conversations, scenarios)
+    client.bypass_cache = client.bypass_cache or no_cache
+
+    async with client.batch_context():
+        if use_ledger:
+            ledger = WorkLedger("evaluate")
+            client.metrics.worker = ledger.worker_id
+            shard_note = f", shard {shard[0] + 1}/{shard[1]}" if shard else ""
+            print(f"🗂️  Claiming units from {ledger.path} as {ledger.worker_id}{shard_note}")
+            results = await judge.evaluate_with_ledger(scenarios, ledger, shard)
+            print(f"\n✅ Worker {ledger.worker_id}: {results['done']} evaluated, {results['failed']} failed; "
+                  f"ledger {ledger.counts()}")
+        else:
+            evaluations = await judge.evaluate_all_conversations(conversations, scenarios)
 
-    print(f"\n✅ Completed {len(evaluations)} evaluations")
-    print("📁 Results saved to: data/evaluations.json")
+    if not use_ledger:
+        print(f"\n✅ Completed {len(evaluations)} evaluations")
+        if evaluations:
+            runs = sum(e["num_runs"] for e in evaluations)
+            print(f"⚖️  {runs} judge runs ({runs / len(evaluations):.2f} per conversation)")
+    stats = client.cache_stats()
+    if stats and not client.bypass_cache:
+        print(f"🗄️  Response cache: {stats['hits']} hits, {stats['misses']} misses")
+    # Spawned workers leave the evaluations.json export to the parent process
+    if export:
+        export_results(judge.store)
+    print(f"💵 {client.ledger.run_summary()} (details: python src/usage_ledger.py --run latest)")
+    client.metrics.print_summary()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Evaluate collected conversations with the judge model")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Bypass the response cache and re-run every judge call")
+    parser.add_argument("--adaptive", action=argparse.BooleanOptionalAction, default=None,
+                        help="Adaptive judge runs on or off (overrides judging.adaptive in config/models.yaml)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Evaluate with this many processes sharing the work ledger")
+    parser.add_argument("--shard", type=parse_shard,
+                        help="I/N: only take shard I of N of the work (e.g. one shard per machine)")
+    parser.add_argument("--worker-process", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.workers > 1 and not args.worker_process:
+        sys.exit(run_workers(args.workers))
+    asyncio.run(main(
+        no_cache=args.no_cache,
+        adaptive=args.adaptive,
+        shard=args.shard,
+        use_ledger=args.worker_process or args.shard is not None,
+        export=not args.worker_process
+    ))
@@ -1,12 +1,16 @@
 #!/usr/bin/env python3
 
 import sys
+import json
 from pathlib import Path
 
 # Add src to path for imports
 sys.path.append(str(Path(__file__).parent.parent / "src"))
 
 from analyzer import Analyzer
+from evaluation_store import EvaluationStore
+from columnar_export import export_evaluations, export_conversations
+from web_export import export_web_bundles
 
 
 def main():
@@ -19,7 +23,26 @@ def main():
 
     # Load data
     try:
-        analyzer.load_data()
+        eval_file = "data/evaluations.json"
+        evaluations = None
+        # Export the latest evaluations.json from the append-only store
+        if Path("data/evaluations.jsonl").exists() or Path("data/evaluations.json").exists():
+            store = EvaluationStore()
+            evaluations = store.load_all()
+            store.export_json(evaluations=evaluations)
+
+            # Columnar copy for analysis (optional pyarrow dependency)
+            try:
+                with open("data/scenarios.json", "r") as f:
+                    scenarios = json.load(f)
+                export_evaluations(evaluations, scenarios)
+                export_conversations()
+                eval_file = "data/evaluations.parquet"
+                print("📦 Exported data/evaluations.parquet and data/conversations.parquet")
+            except ImportError as e:
+                print(f"⚠️  Skipping Parquet export: {e}")
+
+        analyzer.load_data(eval_file)
     except FileNotFoundError as e:
         print(f"❌ Error: {e}")
         print("Please run the previous scripts first to generate data.")
@@ -46,12 +69,27 @@ def main():
     shutil.copy("data/evaluations.json", web_eval_path)
     print(f"📁 Copied evaluations.json to web/data/ for interactive HTML")
 
+    # Small precomputed bundles for first paint, plus per-scenario evaluation shards
+    if evaluations is None:
+        with open("data/evaluations.json", "r") as f:
+            evaluations = json.load(f)
+    sizes = export_web_bundles(
+        analyzer.calculate_category_averages(),
+        evaluations,
+        Analyzer.SCORING_DIMENSIONS,
+        web_summary_path.parent
+    )
+    shard_count = len(sizes) - 1
+    print(f"📦 Wrote web/data/aggregates.json ({sizes['aggregates.json'] / 1024:.1f} KB) "
+          f"and {shard_count} evaluation shards (.gz/.br precompressed)")
+
     print("\n✅ Analysis complete!")
     print("📁 Files generated:")
     print("   - results/summary.md (Human-readable findings)")
     print("   - results/summary.json (Machine-readable data)")
     print("   - web/data/summary.json (For interactive HTML charts)")
     print("   - web/data/evaluations.json (For interactive HTML evaluations)")
+    print("   - web/data/aggregates.json, web/data/evaluations/*.json (Precomputed web bundles)")
 
     print("\n🎯 Open results/summary.md to view findings!")
 
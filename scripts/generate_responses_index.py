@@ -1,9 +1,14 @@
 #!/usr/bin/env python3
 """Generate responses index for interactive evaluations section"""
 
+import sys
 import json
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from conversation_archive import ConversationArchive, storage_format
+
 CATEGORY_LABELS = {
     'career_transitions': 'Career Transitions',
     'relationship_patterns': 'Relationship Patterns',
@@ -20,6 +25,16 @@ def main():
     
     responses_dir = Path('data/responses')
     models = ['claude_web_free', 'chatgpt_web_free', 'gemini_web_free']
+
+    # One directory listing (or archive index) per model instead of a stat per scenario
+    if storage_format() == 'packed':
+        archive = ConversationArchive(responses_dir)
+        saved = {model: set(archive.pack(model).index) for model in models}
+    else:
+        saved = {
+            model: {p.stem for p in (responses_dir / model).glob('*.json')}
+            for model in models
+        }
     
     # Track category indices
     category_indices = {cat: 0 for cat in CATEGORY_LABELS.keys()}
@@ -32,8 +47,7 @@ def main():
         # Check which models have responses
         available_models = []
         for model in models:
-            response_file = responses_dir / model / f"{scenario['id']}.json"
-            if response_file.exists():
+            if scenario['id'] in saved[model]:
                 available_models.append(model)
         
         index.append({
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""Time CoachBench's own hot paths on synthetic datasets and track the results
+
+Each scale (1x = the current 42 scenarios x 5 models) is built in a
+temporary directory by replicating the real scenarios, conversations and
+evaluations under new scenario ids. Results are appended to
+results/benchmarks.jsonl and compared against the previous run.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import importlib.util
+from contextlib import redirect_stdout
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, Any, List, Callable
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "src"))
+
+from analyzer import Analyzer
+from evaluation_store import EvaluationStore
+from evaluator import Judge
+from models import ModelName, Scenario
+
+RESULTS_FILE = project_root / "results" / "benchmarks.jsonl"
+
+
+def replicate_id(scenario_id: str, copy: int) -> str:
+    return scenario_id if copy == 0 else f"{scenario_id}_x{copy:03d}"
+
+
+def build_dataset(root: Path, scale: int) -> Dict[str, int]:
+    """Write a dataset `scale` times the size of the real one under root"""
+    data_dir = root / "data"
+    (data_dir / "responses").mkdir(parents=True)
+    shutil.copytree(project_root / "config", root / "config")
+    shutil.copytree(project_root / "prompts", root / "prompts")
+
+    with open(project_root / "data" / "scenarios.json", "r") as f:
+        scenarios = json.load(f)
+    with open(project_root / "data" / "evaluations.json", "r") as f:
+        evaluations = json.load(f)
+
+    synthetic_scenarios = [
+        dict(s, id=replicate_id(s["id"], copy)) for copy in range(scale) for s in scenarios
+    ]
+    with open(data_dir / "scenarios.json", "w") as f:
+        json.dump(synthetic_scenarios, f, indent=2)
+
+    conversations = 0
+    for model_dir in sorted((project_root / "data" / "responses").iterdir()):
+        if not model_dir.is_dir():
+            continue
+        out_dir = data_dir / "responses" / model_dir.name
+        out_dir.mkdir()
+        for file_path in sorted(model_dir.glob("*.json")):
+            with open(file_path, "r") as f:
+                conversation = json.load(f)
+            for copy in range(scale):
+                scenario_id = replicate_id(conversation["scenario_id"], copy)
+                with open(out_dir / f"{scenario_id}.json", "w") as f:
+                    json.dump(dict(conversation, scenario_id=scenario_id), f, indent=2)
+                conversations += 1
+
+    synthetic_evaluations = [
+        dict(e, scenario_id=replicate_id(e["scenario_id"], copy))
+        for copy in range(scale) for e in evaluations
+    ]
+    with open(data_dir / "evaluations.json", "w") as f:
+        json.dump(synthetic_evaluations, f, indent=2)
+
+    return {
+        "scenarios": len(synthetic_scenarios),
+        "conversations": conversations,
+        "evaluations": len(synthetic_evaluations)
+    }
+
+
+def best_time(fn: Callable[[], Any], repeats: int) -> float:
+    """Best wall-clock time of `repeats` calls (their progress output is discarded)"""
+    times = []
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        for _ in range(repeats):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def load_index_script():
+    spec = importlib.util.spec_from_file_location(
+        "generate_responses_index", project_root / "scripts" / "generate_responses_index.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_scale(scale: int, repeats: int, save_sample: int) -> List[Dict[str, Any]]:
+    """Build one synthetic dataset and time every hot path on it"""
+    results = []
+
+    def record(name: str, items: int, seconds: float):
+        results.append({"benchmark": name, "items": items, "seconds": round(seconds, 6)})
+        per_item = seconds / items * 1e6 if items else 0
+        print(f"  {name:<28} {seconds * 1000:>10.1f} ms  ({items} items, {per_item:.1f} µs/item)")
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix=f"coachbench-bench-{scale}x-") as tmp:
+        root = Path(tmp)
+        start = time.perf_counter()
+        sizes = build_dataset(root, scale)
+        print(f"\n📦 {scale}x dataset: {sizes['scenarios']} scenarios, {sizes['conversations']} conversations, "
+              f"{sizes['evaluations']} evaluations (built in {time.perf_counter() - start:.1f}s)")
+
+        os.chdir(root)
+        try:
+            judge = Judge()
+
+            conversations = []
+
+            def load_conversations():
+                conversations[:] = judge.load_conversations()
+
+            record("load_conversations", sizes["conversations"], best_time(load_conversations, repeats))
+
+            with open("data/scenarios.json", "r") as f:
+                scenario_map = {s["id"]: Scenario(**s) for s in json.load(f)}
+            pairs = [(scenario_map[c.scenario_id], c) for c in conversations]
+
+            record("build_evaluation_prompt", len(pairs), best_time(
+                lambda: [judge._build_evaluation_messages(s, c) for s, c in pairs], repeats
+            ))
+
+            with open("data/evaluations.json", "r") as f:
+                evaluations = json.load(f)
+            judge_outputs = [
+                (ModelName(e["model"]), e["scenario_id"], "```json\n" + json.dumps(run, indent=2) + "\n```")
+                for e in evaluations for run in e.get("runs", [e])
+            ]
+            record("parse_evaluation", len(judge_outputs), best_time(
+                lambda: [judge._parse_evaluation(text, model, sid) for model, sid, text in judge_outputs],
+                repeats
+            ))
+
+            # Durable appends fsync each line, so only a sample is written
+            sample = evaluations[:save_sample]
+
+            def save_evaluations():
+                judge.store = EvaluationStore(path="bench_store.jsonl", legacy_path=None)
+                for evaluation in sample:
+                    judge.save_evaluation(evaluation)
+                os.unlink("bench_store.jsonl")
+
+            record("save_evaluation", len(sample), best_time(save_evaluations, repeats))
+
+            analyzer = Analyzer()
+            record("analyzer_load_data", sizes["evaluations"], best_time(
+                lambda: analyzer.load_data("data/evaluations.json", "data/scenarios.json"), repeats
+            ))
+
+            def model_averages():
+                analyzer._model_averages = None
+                analyzer.calculate_model_averages()
+
+            record("calculate_model_averages", sizes["evaluations"], best_time(model_averages, repeats))
+
+            index_script = load_index_script()
+            record("generate_responses_index", sizes["scenarios"], best_time(index_script.main, repeats))
+        finally:
+            os.chdir(cwd)
+
+    for result in results:
+        result["scale"] = scale
+    return results
+
+
+def load_history(path: Path) -> List[Dict[str, Any]]:
+    if not path.exists():
+        return []
+    with open(path, "r") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def compare(results: List[Dict[str, Any]], history: List[Dict[str, Any]], threshold: float) -> List[str]:
+    """Benchmarks slower than the previous run of the same scale by more than threshold"""
+    previous = {}
+    for record in history:
+        previous[(record["benchmark"], record["scale"])] = record
+
+    regressions = []
+    for result in results:
+        before = previous.get((result["benchmark"], result["scale"]))
+        if not before or not before["seconds"]:
+            continue
+        # Compare per item in case the base dataset grew between runs
+        ratio = (result["seconds"] / max(result["items"], 1)) / (before["seconds"] / max(before["items"], 1))
+        if ratio > 1 + threshold:
+            regressions.append(
+                f"{result['benchmark']} @ {result['scale']}x: {ratio:.2f}x slower than {before['commit'][:8]}"
+            )
+    return regressions
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=project_root, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CoachBench's data paths on synthetic datasets")
+    parser.add_argument("--scales", default="1,10,100", help="Comma-separated dataset multipliers")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed repetitions per benchmark (best is kept)")
+    parser.add_argument("--save-sample", type=int, default=500, help="Evaluations appended in save_evaluation")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Slowdown that counts as a regression")
+    parser.add_argument("--no-record", action="store_true", help="Do not append to results/benchmarks.jsonl")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit 1 if any benchmark regressed")
+    args = parser.parse_args()
+
+    print("=== CoachBench performance benchmarks ===")
+    scales = [int(s) for s in args.scales.split(",")]
+
+    run = {
+        "run_at": datetime.now().isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version()
+    }
+    results = []
+    for scale in scales:
+        results.extend(dict(run, **r) for r in run_scale(scale, args.repeats, args.save_sample))
+
+    regressions = compare(results, load_history(RESULTS_FILE), args.threshold)
+
+    if not args.no_record:
+        RESULTS_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with open(RESULTS_FILE, "a") as f:
+            for result in results:
+                f.write(json.dumps(result) + "\n")
+        print(f"\n📁 Results appended to {RESULTS_FILE.relative_to(project_root)}")
+
+    if regressions:
+        print(f"\n⚠️  {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for regression in regressions:
+            print(f"   - {regression}")
+        if args.fail_on_regression:
+            sys.exit(1)
+    else:
+        print("\n✅ No regressions against the previous run")
+
+
+if __name__ == "__main__":
+    main()
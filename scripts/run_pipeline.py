@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "src"))
+
+from api_client import get_client
+from pipeline import Pipeline
+
+
+async def main(judge_workers: int = None, queue_size: int = None, no_cache: bool = False):
+    """Collect responses and evaluate them in one overlapped pass"""
+    print("=== LLM Reflective Questioning Benchmark ===")
+    print("Phases 2+3: Collecting and Evaluating (pipelined)")
+    print("-" * 40)
+
+    client = get_client()
+    pipeline = Pipeline(client=client, judge_workers=judge_workers, queue_size=queue_size)
+    scenarios = pipeline.collector.load_scenarios()
+
+    print(f"📋 Loaded {len(scenarios)} scenarios")
+    print(f"⚖️  {pipeline.judge_workers} judge workers, queue size {pipeline.queue_size}")
+    print("💾 Conversations and evaluations are saved as they complete")
+    print("⏸️  Can resume from where it left off if interrupted")
+    print()
+
+    client.bypass_cache = client.bypass_cache or no_cache
+
+    async with client.batch_context():
+        evaluations = await pipeline.run(scenarios)
+
+    exported = pipeline.judge.store.export_json()
+
+    print(f"\n✅ Completed {len(evaluations)} evaluations ({pipeline.failed} failed)")
+    if pipeline.budget_reached:
+        print(f"💸 Stopped early: {pipeline.budget_reached}. Re-run with a higher budget to resume.")
+    print("📁 Responses saved to: data/responses/[model]/")
+    print(f"📁 Results saved to: data/evaluations.jsonl ({exported} exported to data/evaluations.json)")
+    print(f"💵 {client.ledger.run_summary()} (details: python src/usage_ledger.py --run latest)")
+    client.metrics.print_summary()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Collect and evaluate conversations with overlapping phases")
+    parser.add_argument("--judges", type=int, help="Number of concurrent judge workers")
+    parser.add_argument("--queue-size", type=int, help="Conversations buffered for judging before collection pauses")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Bypass the response cache and sample every request fresh")
+    args = parser.parse_args()
+    asyncio.run(main(judge_workers=args.judges, queue_size=args.queue_size, no_cache=args.no_cache))
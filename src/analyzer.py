@@ -1,12 +1,13 @@
 import json
 import yaml
-import pandas as pd
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Sequence, Tuple
 from datetime import datetime
 import numpy as np
 
 from models import ModelName, Evaluation, EvaluationSummary, Scenario
+from bootstrap import bootstrap_rankings
+from columnar_export import read_analysis_columns
 
 
 class Analyzer:
@@ -29,6 +30,12 @@ class Analyzer:
         self.evaluations = []
         self.scenarios = []
 
+        # Columnar view of the evaluations, built once by load_data()
+        self.table: Dict[str, np.ndarray] = {}
+        self.run_table: Dict[str, np.ndarray] = {}
+        self.labels: Dict[str, List[str]] = {}
+        self._model_averages: Optional[Dict[ModelName, Dict[str, float]]] = None
+
         # Load model configuration
         with open("config/models.yaml", "r") as f:
             self.config = yaml.safe_load(f)
@@ -39,60 +46,305 @@ class Analyzer:
 
     def load_data(self, eval_file: str = "data/evaluations.json",
                   scenario_file: str = "data/scenarios.json"):
-        """Load evaluation and scenario data - supports both old and new formats"""
-
-        with open(eval_file, "r") as f:
-            eval_data = json.load(f)
+        """Load evaluation and scenario data - supports both old and new formats
 
-        # Handle both old format (list of Evaluation objects) and new format (dict with aggregated)
-        self.evaluations = []
-        for eval_item in eval_data:
-            if isinstance(eval_item, dict) and "aggregated" in eval_item:
-                # New format: multi-run evaluation with aggregated results
-                self.evaluations.append(eval_item)
-            else:
-                # Old format: single Evaluation object
-                self.evaluations.append(Evaluation(**eval_item))
+        A .parquet eval_file (see columnar_export.py) is read column-wise,
+        skipping the free-text judge output entirely.
+        """
 
         with open(scenario_file, "r") as f:
             scenario_data = json.load(f)
         self.scenarios = [Scenario(**s) for s in scenario_data]
 
-        print(f"Loaded {len(self.evaluations)} evaluations and {len(self.scenarios)} scenarios")
+        self.evaluations = []
+        if str(eval_file).endswith(".parquet"):
+            self._build_table_from_parquet(eval_file)
+        else:
+            with open(eval_file, "r") as f:
+                eval_data = json.load(f)
+
+            # Handle both old format (list of Evaluation objects) and new format (dict with aggregated)
+            for eval_item in eval_data:
+                if isinstance(eval_item, dict) and "aggregated" in eval_item:
+                    # New format: multi-run evaluation with aggregated results
+                    self.evaluations.append(eval_item)
+                else:
+                    # Old format: single Evaluation object
+                    self.evaluations.append(Evaluation(**eval_item))
+
+            self._build_table()
+
+        print(f"Loaded {self.num_evaluations} evaluations and {len(self.scenarios)} scenarios")
+
+    @property
+    def num_evaluations(self) -> int:
+        return len(self.table.get("model", []))
+
+    def _build_table(self):
+        """Load evaluations into NumPy columns: one row per evaluation and one per judge run"""
+
+        category_by_scenario = {s.id: s.category.value for s in self.scenarios}
+        codes = {"model": {}, "scenario": {}, "category": {}}
+
+        def encode(column: str, value: str) -> int:
+            return codes[column].setdefault(value, len(codes[column]))
+
+        n = len(self.evaluations)
+        num_dims = len(self.SCORING_DIMENSIONS)
+        model_codes = np.empty(n, dtype=np.int64)
+        scenario_codes = np.empty(n, dtype=np.int64)
+        category_codes = np.empty(n, dtype=np.int64)
+        scores = np.empty((n, num_dims))
+        totals = np.empty(n)
+        total_stds = np.full(n, np.nan)
+        run_evals, run_scores = [], []
+
+        for i, e in enumerate(self.evaluations):
+            if isinstance(e, dict):
+                model, scenario_id = e["model"], e["scenario_id"]
+                aggregated = e["aggregated"]
+                scores[i] = [aggregated["mean_scores"][dim] for dim in self.SCORING_DIMENSIONS]
+                totals[i] = aggregated["total_mean"]
+                total_stds[i] = aggregated["total_std"]
+                for run in e.get("runs", []):
+                    run_evals.append(i)
+                    run_scores.append([run["scores"][dim] for dim in self.SCORING_DIMENSIONS])
+            else:
+                model, scenario_id = e.model.value, e.scenario_id
+                scores[i] = [getattr(e.scores, dim) for dim in self.SCORING_DIMENSIONS]
+                totals[i] = e.total_score
+                run_evals.append(i)
+                run_scores.append(scores[i].tolist())
+
+            model_codes[i] = encode("model", model)
+            scenario_codes[i] = encode("scenario", scenario_id)
+            category_codes[i] = encode("category", category_by_scenario.get(scenario_id, "unknown"))
+
+        self.table = {
+            "model": model_codes,
+            "scenario": scenario_codes,
+            "category": category_codes,
+            "scores": scores,
+            "total_score": totals,
+            "total_std": total_stds
+        }
+        run_scores = np.array(run_scores, dtype=float).reshape(-1, num_dims)
+        self.run_table = {
+            "evaluation": np.array(run_evals, dtype=np.int64),
+            "scores": run_scores,
+            "total_score": run_scores.sum(axis=1)
+        }
+        self.labels = {column: list(values) for column, values in codes.items()}
+        self._model_averages = None
+
+    def _build_table_from_parquet(self, eval_file: str):
+        """Build the columnar tables from a per-run Parquet export"""
+
+        columns = read_analysis_columns(eval_file)
+        models = columns["model"].astype(str)
+        scenario_ids = columns["scenario_id"].astype(str)
+
+        # Evaluations are identified by (model, scenario), in first-appearance order
+        keys = np.char.add(np.char.add(models, "\x00"), scenario_ids)
+        _, first_row, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        order = np.argsort(first_row, kind="stable")
+        position = np.empty_like(order)
+        position[order] = np.arange(len(order))
+        run_evaluation = position[inverse.reshape(-1)]
+        eval_rows = first_row[order]
+
+        # Keep each evaluation's runs contiguous
+        run_order = np.argsort(run_evaluation, kind="stable")
+
+        self.labels = {}
+        self.table = {}
+        for column, values in (("model", models), ("scenario", scenario_ids),
+                               ("category", columns["category"].astype(str))):
+            # Codes in first-appearance order, matching the JSON loader
+            labels, first, codes = np.unique(values[eval_rows], return_index=True, return_inverse=True)
+            order = np.argsort(first, kind="stable")
+            remap = np.empty_like(order)
+            remap[order] = np.arange(len(order))
+            self.labels[column] = labels[order].tolist()
+            self.table[column] = remap[codes.reshape(-1)].astype(np.int64)
+
+        self.table["scores"] = np.column_stack(
+            [columns[f"mean_{dim}"][eval_rows] for dim in self.SCORING_DIMENSIONS]
+        ).astype(float)
+        self.table["total_score"] = columns["total_mean"][eval_rows].astype(float)
+        self.table["total_std"] = columns["total_std"][eval_rows].astype(float)
+
+        run_scores = np.column_stack(
+            [columns[dim][run_order] for dim in self.SCORING_DIMENSIONS]
+        ).astype(float)
+        self.run_table = {
+            "evaluation": run_evaluation[run_order],
+            "scores": run_scores,
+            "total_score": run_scores.sum(axis=1)
+        }
+        self._model_averages = None
+
+    def group_means(
+        self,
+        by: Sequence[str] = ("model",),
+        runs: bool = False
+    ) -> Dict[Tuple[str, ...], Dict[str, float]]:
+        """Mean of every dimension and the total per group, in one vectorized pass
+
+        `by` is any combination of "model", "scenario" and "category". With
+        runs=True the rows are individual judge runs instead of aggregated
+        evaluations (no total_std column).
+        """
+        table = self.run_table if runs else self.table
+        rows = self.run_table["evaluation"] if runs else slice(None)
+
+        if runs:
+            values = np.column_stack([table["scores"], table["total_score"]])
+            columns = self.SCORING_DIMENSIONS + ["total_score"]
+        else:
+            values = np.column_stack([table["scores"], table["total_score"], table["total_std"]])
+            columns = self.SCORING_DIMENSIONS + ["total_score", "total_std"]
+
+        if len(values) == 0:
+            return {}
+
+        keys = np.column_stack([self.table[column][rows] for column in by])
+        groups, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+
+        counts = np.bincount(inverse, minlength=len(groups))
+        sums = np.zeros((len(groups), values.shape[1]))
+        np.add.at(sums, inverse, values)
+        means = sums / counts[:, None]
+
+        result = {}
+        for group, row, count in zip(groups, means, counts):
+            label = tuple(self.labels[column][code] for column, code in zip(by, group))
+            result[label] = dict(zip(columns, row.tolist()))
+            result[label]["count"] = int(count)
+        return result
 
     def calculate_model_averages(self) -> Dict[ModelName, Dict[str, float]]:
         """Calculate average scores by model - uses aggregated results when available"""
 
-        model_scores = {}
+        if self._model_averages is not None:
+            return self._model_averages
+
+        grouped = self.group_means(("model",))
 
+        model_scores = {}
         for model in ModelName:
             if model == ModelName.QWEN_72B or model == ModelName.DEEPSEEK_V3:
                 continue  # Skip non-test models
 
-            model_evals = [e for e in self.evaluations
-                          if (e["model"] if isinstance(e, dict) else e.model) == model.value]
-            if not model_evals:
+            row = grouped.get((model.value,))
+            if row is None:
                 continue
 
-            # Check if we have aggregated results (new format)
-            if isinstance(model_evals[0], dict) and "aggregated" in model_evals[0]:
-                # Use aggregated mean from multi-run evaluation
-                scores = {}
-                for dim in self.SCORING_DIMENSIONS:
-                    scores[dim] = np.mean([ev["aggregated"]["mean_scores"][dim] for ev in model_evals])
-                scores["total_score"] = np.mean([ev["aggregated"]["total_mean"] for ev in model_evals])
-                scores["total_std"] = np.mean([ev["aggregated"]["total_std"] for ev in model_evals])
-            else:
-                # Old format: calculate from individual evaluations
-                scores = {}
-                for dim in self.SCORING_DIMENSIONS:
-                    scores[dim] = np.mean([getattr(e.scores, dim) for e in model_evals])
-                scores["total_score"] = np.mean([e.total_score for e in model_evals])
+            scores = {dim: row[dim] for dim in self.SCORING_DIMENSIONS}
+            scores["total_score"] = row["total_score"]
+            # total_std only exists for multi-run evaluations (NaN for the old format)
+            if not np.isnan(row["total_std"]):
+                scores["total_std"] = row["total_std"]
 
             model_scores[model] = scores
 
+        self._model_averages = model_scores
         return model_scores
 
+    def calculate_category_averages(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """Average dimension and total scores per category and model"""
+        categories = {}
+        for (category, model), row in self.group_means(("category", "model")).items():
+            categories.setdefault(category, {})[model] = row
+        return categories
+
+    def _test_models(self) -> List[str]:
+        """Evaluated test models in ModelName order"""
+        return [
+            model.value for model in ModelName
+            if model not in (ModelName.QWEN_72B, ModelName.DEEPSEEK_V3)
+            and model.value in self.labels.get("model", [])
+        ]
+
+    def run_score_tensor(self, models: List[str]) -> np.ndarray:
+        """Run total scores as a (models, scenarios, runs) array, NaN where missing"""
+
+        evaluation = self.run_table["evaluation"]
+        # Position of each run within its evaluation (runs are stored contiguously)
+        run_position = np.arange(len(evaluation)) - np.searchsorted(evaluation, evaluation)
+
+        model_index = np.full(len(self.labels["model"]), -1)
+        for i, model in enumerate(models):
+            model_index[self.labels["model"].index(model)] = i
+
+        rows = model_index[self.table["model"][evaluation]]
+        keep = rows >= 0
+        tensor = np.full(
+            (len(models), len(self.labels["scenario"]), int(run_position.max(initial=0)) + 1),
+            np.nan
+        )
+        tensor[rows[keep], self.table["scenario"][evaluation][keep], run_position[keep]] = \
+            self.run_table["total_score"][keep]
+        return tensor
+
+    def evaluation_total_matrix(self, models: List[str]) -> np.ndarray:
+        """Ranked evaluation totals as a (models, scenarios) array, NaN where missing"""
+        model_index = np.full(len(self.labels["model"]), -1)
+        for i, model in enumerate(models):
+            model_index[self.labels["model"].index(model)] = i
+
+        rows = model_index[self.table["model"]]
+        keep = rows >= 0
+        matrix = np.full((len(models), len(self.labels["scenario"])), np.nan)
+        matrix[rows[keep], self.table["scenario"][keep]] = self.table["total_score"][keep]
+        return matrix
+
+    def bootstrap_ranking(
+        self,
+        num_resamples: Optional[int] = None,
+        confidence: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Bootstrap CIs, pairwise win probabilities and rank distributions of total scores"""
+
+        analysis_config = self.config.get("analysis", {})
+        num_resamples = num_resamples or analysis_config.get("bootstrap_resamples", 10000)
+        confidence = confidence or analysis_config.get("confidence", 0.95)
+
+        models = self._test_models()
+        if not models:
+            return {}
+
+        # Centred on the same evaluation totals create_ranking() averages
+        result = bootstrap_rankings(
+            self.run_score_tensor(models),
+            totals=self.evaluation_total_matrix(models),
+            num_resamples=num_resamples,
+            confidence=confidence,
+            seed=analysis_config.get("bootstrap_seed", 0)
+        )
+
+        return {
+            "num_resamples": num_resamples,
+            "confidence": confidence,
+            "models": {
+                model: {
+                    "mean": round(float(result["mean"][i]), 2),
+                    "ci_low": round(float(result["ci_low"][i]), 2),
+                    "ci_high": round(float(result["ci_high"][i]), 2),
+                    "rank_distribution": [round(float(p), 4) for p in result["rank_distribution"][i]]
+                }
+                for i, model in enumerate(models)
+            },
+            "pairwise_win_probability": {
+                model_a: {
+                    model_b: round(float(result["win_probability"][i, j]), 4)
+                    for j, model_b in enumerate(models) if j != i
+                }
+                for i, model_a in enumerate(models)
+            }
+        }
+
     def create_ranking(self) -> List[Dict[str, Any]]:
         """Create overall ranking of models - includes std for multi-run evaluations"""
 
@@ -153,9 +405,10 @@ class Analyzer:
 
         summary = {
             "total_scenarios": len(self.scenarios),
-            "total_evaluations": len(self.evaluations),
+            "total_evaluations": self.num_evaluations,
             "model_averages": model_averages_output,
             "overall_ranking": ranking,
+            "bootstrap": self.bootstrap_ranking(),
             "generated_at": str(datetime.now())
         }
 
@@ -216,6 +469,23 @@ Key strengths:
 - Maintains Client Agency: {best_model['maintains_client_agency']:.1f}/5
 """
 
+        bootstrap = summary.get("bootstrap", {})
+        if bootstrap.get("models"):
+            confidence = int(bootstrap["confidence"] * 100)
+            md_content += f"""
+## Ranking Stability
+
+Bootstrap over scenarios and judge runs ({bootstrap['num_resamples']} resamples).
+
+| Model | Mean | {confidence}% CI | P(rank 1) |
+|-------|------|-------|-----------|
+"""
+            for r in ranking:
+                stats = bootstrap["models"].get(r["model"])
+                if stats:
+                    model_desc = self.model_descriptions.get(r["model"], r["model"])
+                    md_content += f"| {model_desc} | {stats['mean']:.1f} | {stats['ci_low']:.1f} – {stats['ci_high']:.1f} | {stats['rank_distribution'][0]:.0%} |\n"
+
         md_content += """
 ## Methodology
 
@@ -1,24 +1,42 @@
 import os
+import json
 import time
+import importlib.util
 import yaml
 import asyncio
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from enum import Enum
+from typing import List, Dict, Any, Optional, Callable, TYPE_CHECKING
 from contextlib import asynccontextmanager
 
-import httpx
-from tenacity import retry, stop_after_attempt, wait_exponential
-from dotenv import load_dotenv
-
 from src.models import ModelName, Message, ModelResponse, QueryRequest
+from src.rate_limiter import RateLimiter
+from src.response_cache import ResponseCache
+from src.retry_policy import RetryPolicy, CircuitBreaker, StreamInterruptedError, with_retries, hedged
+# Imported without the src. prefix like the pipeline modules that set the
+# usage_context tags, so both sides share one context variable; falls back to
+# src. when only the project root is on sys.path (callers that import this
+# module as src.api_client take usage_context and BudgetExceeded from here)
+try:
+    from usage_ledger import UsageLedger, BudgetExceeded, usage_context
+    from request_metrics import RequestMetrics, RequestSpan
+except ImportError:
+    from src.usage_ledger import UsageLedger, BudgetExceeded, usage_context
+    from src.request_metrics import RequestMetrics, RequestSpan
 
-load_dotenv()
+# httpx and dotenv are imported when a client is built or a request
+# is made, so offline code importing this module does not pay for them
+if TYPE_CHECKING:
+    import httpx
 
 
 class ModelClient:
     """Unified interface for OpenRouter and DeepSeek APIs"""
     
-    def __init__(self):
+    def __init__(self, config_path: str = "config/models.yaml"):
+        from dotenv import load_dotenv
+        load_dotenv()
+
         self.openrouter_api_key = os.getenv("OPENROUTER_API_KEY")
         self.deepseek_api_key = os.getenv("DEEPSEEK_API_KEY")
         
@@ -26,7 +44,7 @@ class ModelClient:
         self.deepseek_base_url = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com/v1")
         
         # Load model configurations
-        with open("config/models.yaml", "r") as f:
+        with open(config_path, "r") as f:
             self.config = yaml.safe_load(f)
         
         if not self.openrouter_api_key or not self.deepseek_api_key:
@@ -35,19 +53,82 @@ class ModelClient:
         # Ensure API keys are strings
         self.openrouter_api_key = str(self.openrouter_api_key)
         self.deepseek_api_key = str(self.deepseek_api_key)
+
+        # Per-provider concurrency limits, created lazily per model
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+        # Pooled keep-alive HTTP clients, one per base URL
+        self._http_clients: Dict[str, "httpx.AsyncClient"] = {}
+
+        # Shared request/token budgets per provider and model
+        self.rate_limiter = RateLimiter(self.config.get("rate_limits", {}))
+
+        # Optional persistent response cache; COACHBENCH_NO_CACHE=1 bypasses it
+        cache_config = self.config.get("cache", {})
+        self.cache: Optional[ResponseCache] = None
+        if cache_config.get("enabled", False):
+            self.cache = ResponseCache(
+                path=cache_config.get("path", "data/cache/responses.sqlite"),
+                max_age_days=cache_config.get("max_age_days", 30),
+                max_entries=cache_config.get("max_entries", 50000)
+            )
+        self.bypass_cache = os.getenv("COACHBENCH_NO_CACHE", "") not in ("", "0")
+
+        # Per-call token/cost ledger (data/usage.jsonl) with optional budget ceilings
+        self.ledger = UsageLedger(self.config)
+
+        # Per-request spans (data/traces/requests.jsonl) and latency histograms,
+        # sharing the ledger's run id so the two files can be joined
+        self.metrics = RequestMetrics(self.config, trace_id=self.ledger.run_id)
+
+        # Status-aware retries, per-provider circuit breakers and optional hedging
+        self.retry_policy = RetryPolicy(self.config.get("retries", {}))
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self.hedging = self.config.get("retries", {}).get("hedging", {}).get("enabled", False)
+
+    def _get_http_client(self, base_url: str) -> "httpx.AsyncClient":
+        """Get (or create) the pooled HTTP client for a base URL"""
+        if base_url not in self._http_clients:
+            import httpx
+
+            http_config = self.config.get("http", {})
+
+            # HTTP/2 needs the optional 'h2' package (httpx[http2])
+            http2 = http_config.get("http2", True) and importlib.util.find_spec("h2") is not None
+
+            self._http_clients[base_url] = httpx.AsyncClient(
+                http2=http2,
+                timeout=httpx.Timeout(
+                    http_config.get("timeout", 60.0),
+                    connect=http_config.get("connect_timeout", 10.0)
+                ),
+                limits=httpx.Limits(
+                    max_connections=http_config.get("max_connections", 20),
+                    max_keepalive_connections=http_config.get("max_keepalive_connections", 10),
+                    keepalive_expiry=http_config.get("keepalive_expiry", 30.0)
+                )
+            )
+        return self._http_clients[base_url]
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Response cache hit/miss counters (empty when the cache is disabled)"""
+        return self.cache.stats() if self.cache is not None else {}
+
+    async def aclose(self):
+        """Close all pooled HTTP clients"""
+        http_clients = list(self._http_clients.values())
+        self._http_clients.clear()
+        for http_client in http_clients:
+            await http_client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
     
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-    async def _make_request(
-        self, 
-        base_url: str, 
-        api_key: str, 
-        model: str, 
-        messages: List[Dict[str, str]], 
-        temperature: float = 0.7,
-        max_tokens: int = 1500
-    ) -> tuple[Dict[str, Any], float]:
-        """Make HTTP request to API with retry logic"""
-        
+    def _request_headers(self, base_url: str, api_key: str) -> Dict[str, str]:
+        """Build request headers for a provider"""
         headers = {
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json"
@@ -57,6 +138,85 @@ class ModelClient:
         if "openrouter" in base_url:
             headers["HTTP-Referer"] = "https://github.com/yourusername/coaching-llm-benchmark"
             headers["X-Title"] = "LLM Coaching Benchmark"
+
+        return headers
+
+    @staticmethod
+    def _estimate_tokens(messages: List[Dict[str, str]], max_tokens: int) -> int:
+        """Rough token estimate (~4 chars/token), reconciled with real usage after the call"""
+        return sum(len(m["content"]) for m in messages) // 4 + max_tokens
+
+    def _record_usage(self, provider: str, model_key: str, estimated_tokens: int, usage: Any):
+        if isinstance(usage, dict):
+            self.rate_limiter.record_usage(
+                provider, model_key, estimated_tokens, usage.get("total_tokens", 0)
+            )
+    
+    def _circuit_breaker(self, provider: str) -> CircuitBreaker:
+        """Get (or create) the circuit breaker for a provider"""
+        if provider not in self._breakers:
+            breaker_config = self.config.get("retries", {}).get("circuit_breaker", {})
+            self._breakers[provider] = CircuitBreaker(
+                provider,
+                failure_threshold=breaker_config.get("failure_threshold", 5),
+                cooldown=breaker_config.get("cooldown", 30.0)
+            )
+        return self._breakers[provider]
+
+    def _request_timeout(self, provider: str, model_key: str, attempt: int, stream: bool = False) -> "httpx.Timeout":
+        """Read timeout from the model's observed latency (TTFT when streaming)
+
+        Falls back to http.timeout until enough requests have been seen, and
+        doubles on each retry so a slow-but-healthy model is not cut off twice.
+        """
+        import httpx
+
+        http_config = self.config.get("http", {})
+        timeout_config = self.config.get("retries", {}).get("timeouts", {})
+        ceiling = timeout_config.get("max", 120.0)
+
+        read = http_config.get("timeout", 60.0)
+        if timeout_config.get("adaptive", True):
+            observed = self.metrics.quantile(
+                (provider, model_key), "ttft" if stream else "latency",
+                timeout_config.get("quantile", 0.99), timeout_config.get("min_samples", 20)
+            )
+            if observed is not None:
+                read = max(observed / 1000 * timeout_config.get("multiplier", 3.0), timeout_config.get("min", 15.0))
+
+        read = min(read * 2 ** (attempt - 1), ceiling)
+        return httpx.Timeout(read, connect=http_config.get("connect_timeout", 10.0))
+
+    def _hedge_delay(self, provider: str, model_key: str) -> Optional[float]:
+        """Seconds after which a duplicate request is sent, or None when hedging is off"""
+        if not self.hedging:
+            return None
+        hedge_config = self.config.get("retries", {}).get("hedging", {})
+        models = hedge_config.get("models")
+        if models and model_key not in models:
+            return None
+        observed = self.metrics.quantile(
+            (provider, model_key), "latency",
+            hedge_config.get("quantile", 0.95), hedge_config.get("min_samples", 20)
+        )
+        return observed / 1000 if observed is not None else None
+
+    async def _make_request(
+        self, 
+        base_url: str, 
+        api_key: str, 
+        model: str, 
+        messages: List[Dict[str, str]], 
+        temperature: float = 0.7,
+        max_tokens: int = 1500,
+        provider: str = "openrouter",
+        model_key: Optional[str] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+        span: Optional[RequestSpan] = None
+    ) -> tuple[Dict[str, Any], float]:
+        """Make HTTP request to API with retries, rate limiting and optional hedging"""
+        
+        headers = self._request_headers(base_url, api_key)
         
         payload = {
             "model": model,
@@ -64,36 +224,214 @@ class ModelClient:
             "temperature": temperature,
             "max_tokens": max_tokens
         }
+        if response_format is not None:
+            payload["response_format"] = response_format
         
-        start_time = time.time()
-        
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
+        model_key = model_key or model
+        span = span or self.metrics.start_span(provider, model_key)
+        estimated_tokens = self._estimate_tokens(messages, max_tokens)
+
+        async def send_once(timeout: "httpx.Timeout") -> tuple[Dict[str, Any], float]:
+            span.begin_attempt()
+            waiting_since = time.monotonic()
+            await self.rate_limiter.acquire(provider, model_key, estimated_tokens)
+            span.add_rate_limit_wait(waiting_since)
+
+            start_time = time.time()
+
+            response = await self._get_http_client(base_url).post(
                 f"{base_url}/chat/completions",
                 headers=headers,
-                json=payload
+                json=payload,
+                timeout=timeout
             )
+            response_time = (time.time() - start_time) * 1000
+            span.record_response(response, response_time)
+
+            self.rate_limiter.observe_response(provider, model_key, response.status_code, response.headers)
             response.raise_for_status()
-            
+
+            response_data = response.json()
+            self._record_usage(provider, model_key, estimated_tokens, response_data.get("usage"))
+            return response_data, response_time
+
+        async def send(attempt: int) -> tuple[Dict[str, Any], float]:
+            timeout = self._request_timeout(provider, model_key, attempt)
+            return await hedged(
+                lambda: send_once(timeout), self._hedge_delay(provider, model_key), span.mark_hedged
+            )
+
+        return await with_retries(
+            send, self.retry_policy, self._circuit_breaker(provider), label=f"{provider}/{model_key}"
+        )
+
+    async def _make_stream_request(
+        self,
+        base_url: str,
+        api_key: str,
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: int = 1500,
+        provider: str = "openrouter",
+        model_key: Optional[str] = None,
+        on_chunk: Optional[Callable[[str], Any]] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+        span: Optional[RequestSpan] = None
+    ) -> tuple[Dict[str, Any], float, Optional[float]]:
+        """Make a streamed (SSE) request; returns the assembled response, total time and TTFT
+
+        Streams are never hedged, and are retried like plain requests only
+        until the first chunk reaches on_chunk; a failure after that raises
+        StreamInterruptedError so the caller never sees the output twice.
+        """
+
+        headers = self._request_headers(base_url, api_key)
+
+        payload = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": True,
+            "stream_options": {"include_usage": True}
+        }
+        if response_format is not None:
+            payload["response_format"] = response_format
+
+        model_key = model_key or model
+        span = span or self.metrics.start_span(provider, model_key, stream=True)
+        estimated_tokens = self._estimate_tokens(messages, max_tokens)
+        delivered = 0  # chunks handed to on_chunk across attempts
+
+        async def send(attempt: int) -> tuple[Dict[str, Any], float, Optional[float]]:
+            nonlocal delivered
+            span.begin_attempt()
+            waiting_since = time.monotonic()
+            await self.rate_limiter.acquire(provider, model_key, estimated_tokens)
+            span.add_rate_limit_wait(waiting_since)
+
+            start_time = time.time()
+            first_token_time = None
+            chunks = []
+            usage = {}
+
+            async with self._get_http_client(base_url).stream(
+                "POST",
+                f"{base_url}/chat/completions",
+                headers=headers,
+                json=payload,
+                timeout=self._request_timeout(provider, model_key, attempt, stream=True)
+            ) as response:
+                self.rate_limiter.observe_response(provider, model_key, response.status_code, response.headers)
+                if response.is_error:
+                    await response.aread()
+                    span.record_response(response, (time.time() - start_time) * 1000)
+                response.raise_for_status()
+
+                async for line in response.aiter_lines():
+                    # SSE: "data: {...}" events; ":"-prefixed lines are keep-alive comments
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+
+                    event = json.loads(data)
+                    if event.get("usage"):
+                        usage = event["usage"]
+                    for choice in event.get("choices") or []:
+                        delta = (choice.get("delta") or {}).get("content")
+                        if not delta:
+                            continue
+                        if first_token_time is None:
+                            first_token_time = time.time()
+                        chunks.append(delta)
+                        if on_chunk is not None:
+                            delivered += 1
+                            result = on_chunk(delta)
+                            if asyncio.iscoroutine(result):
+                                await result
+
             response_time = (time.time() - start_time) * 1000
-            
-            return response.json(), response_time
+            ttft = (first_token_time - start_time) * 1000 if first_token_time else None
+            span.record_response(response, response_time, ttft)
+
+            self._record_usage(provider, model_key, estimated_tokens, usage)
+
+            response_data = {
+                "choices": [{"message": {"role": "assistant", "content": "".join(chunks)}}],
+                "usage": usage,
+                "stream_chunks": len(chunks)
+            }
+            return response_data, response_time, ttft
+
+        async def send_unless_delivered(attempt: int) -> tuple[Dict[str, Any], float, Optional[float]]:
+            try:
+                return await send(attempt)
+            except Exception as e:
+                if delivered:
+                    raise StreamInterruptedError(
+                        f"{provider}/{model_key} stream failed after {delivered} chunks were delivered: "
+                        f"{type(e).__name__}: {e}"
+                    ) from e
+                raise
+
+        return await with_retries(
+            send_unless_delivered, self.retry_policy, self._circuit_breaker(provider), label=f"{provider}/{model_key}"
+        )
     
+    def _config_key(self, model_name: ModelName) -> str:
+        """Get the config/models.yaml key for a model"""
+        if model_name == ModelName.DEEPSEEK_V3:
+            return "deepseek"
+        return model_name.value if isinstance(model_name, Enum) else str(model_name)
+
     def _get_model_config(self, model_name: ModelName) -> Dict[str, Any]:
         """Get configuration for a specific model"""
-        if model_name == ModelName.DEEPSEEK_V3:
-            return self.config["models"]["deepseek"]
-        else:
-            return self.config["models"][model_name]
+        return self.config["models"][self._config_key(model_name)]
+
+    def _get_semaphore(self, model_name: ModelName) -> asyncio.Semaphore:
+        """Get the concurrency limiter for a model's provider"""
+        key = self._config_key(model_name)
+        if key not in self._semaphores:
+            limits = self.config.get("concurrency", {})
+            limit = limits.get("models", {}).get(key, limits.get("default", 4))
+            self._semaphores[key] = asyncio.Semaphore(limit)
+        return self._semaphores[key]
     
     async def query(
         self, 
         model_name: ModelName, 
         messages: List[Message],
         temperature: Optional[float] = None,
-        max_tokens: Optional[int] = None
+        max_tokens: Optional[int] = None,
+        use_cache: bool = True,
+        cache_variant: Optional[str] = None,
+        stream: Optional[bool] = None,
+        on_chunk: Optional[Callable[[str], Any]] = None,
+        json_mode: bool = False,
+        validate: Optional[Callable[[str], Any]] = None
     ) -> ModelResponse:
-        """Query any model with unified interface"""
+        """Query any model with unified interface
+
+        Results are served from the response cache when enabled. Pass
+        use_cache=False for calls that must sample fresh, or a distinct
+        cache_variant for repeated samples of the same request (e.g. judge runs).
+
+        With stream=True (or `stream: true` on the model in config/models.yaml,
+        or an on_chunk callback) the completion is streamed over SSE: on_chunk is
+        called with each content chunk as it arrives, and the assembled
+        ModelResponse records time-to-first-token and tokens/second.
+
+        json_mode=True requests a JSON object response (response_format) from
+        models with `json_mode: true` in config/models.yaml; other models are
+        queried as usual.
+
+        validate, if given, is called with the content before it is cached;
+        content it raises on is returned but never cached, and a cached entry
+        it raises on is dropped and requested again.
+        """
         
         model_config = self._get_model_config(model_name)
         
@@ -106,38 +444,106 @@ class ModelClient:
         
         # Choose appropriate API
         if model_name == ModelName.DEEPSEEK_V3:
+            provider = "deepseek"
             base_url = self.deepseek_base_url
             api_key = self.deepseek_api_key
             model = model_config["model"]
         else:
+            provider = "openrouter"
             base_url = self.openrouter_base_url
             api_key = self.openrouter_api_key
             model = model_config["endpoint"]
         
-        try:
-            response_data, response_time = await self._make_request(
-                base_url, api_key, model, api_messages, temp, tokens
+        response_format = None
+        if json_mode and model_config.get("json_mode", False):
+            response_format = {"type": "json_object"}
+            cache_variant = f"{cache_variant or ''}#json"
+
+        cache_key = None
+        if self.cache is not None and use_cache and not self.bypass_cache:
+            cache_key = ResponseCache.make_key(
+                f"{base_url}#{model}", api_messages, temp, tokens, cache_variant
             )
+            cached = self.cache.get(cache_key)
+            if cached is not None and validate is not None and not self._passes(validate, cached["content"]):
+                self.cache.delete(cache_key)
+                cached = None
+            if cached is not None:
+                self.ledger.record(self._config_key(model_name), cached.get("usage") or {}, None, cache_hit=True)
+                if on_chunk is not None:
+                    result = on_chunk(cached["content"])
+                    if asyncio.iscoroutine(result):
+                        await result
+                return ModelResponse(model=model_name, **cached)
+
+        if stream is None:
+            stream = on_chunk is not None or model_config.get("stream", False)
+
+        # Raises BudgetExceeded once a configured ceiling is reached
+        self.ledger.check_budget()
+
+        span = self.metrics.start_span(provider, self._config_key(model_name), stream)
+        try:
+            ttft = None
+            queued_since = time.monotonic()
+            async with self._get_semaphore(model_name):
+                span.concurrency_wait_ms = (time.monotonic() - queued_since) * 1000
+                if stream:
+                    response_data, response_time, ttft = await self._make_stream_request(
+                        base_url, api_key, model, api_messages, temp, tokens,
+                        provider=provider, model_key=self._config_key(model_name),
+                        on_chunk=on_chunk, response_format=response_format, span=span
+                    )
+                else:
+                    response_data, response_time = await self._make_request(
+                        base_url, api_key, model, api_messages, temp, tokens,
+                        provider=provider, model_key=self._config_key(model_name),
+                        response_format=response_format, span=span
+                    )
             
             content = response_data["choices"][0]["message"]["content"]
             usage = response_data.get("usage", {})
+            usage = usage if isinstance(usage, dict) else {}
+
+            # Generation speed after the first token; falls back to chunk count without usage
+            tokens_per_second = None
+            if ttft is not None and response_time > ttft:
+                completion_tokens = usage.get("completion_tokens") or response_data.get("stream_chunks", 0)
+                tokens_per_second = completion_tokens / ((response_time - ttft) / 1000)
+
+            result = {
+                "content": content,
+                "usage": usage,
+                "response_time_ms": response_time,
+                "time_to_first_token_ms": ttft,
+                "tokens_per_second": tokens_per_second
+            }
+            if cache_key is not None and (validate is None or self._passes(validate, content)):
+                self.cache.put(cache_key, result)
+            self.ledger.record(self._config_key(model_name), usage, response_time)
             
-            return ModelResponse(
-                model=model_name,
-                content=content,
-                usage=usage if isinstance(usage, dict) else {},
-                response_time_ms=response_time
-            )
+            return ModelResponse(model=model_name, **result)
             
         except Exception as e:
+            span.error = type(e).__name__
             print(f"Error querying {model_name}: {e}")
             raise
+        finally:
+            self.metrics.finish(span)
     
+    @staticmethod
+    def _passes(validate: Callable[[str], Any], content: str) -> bool:
+        try:
+            validate(content)
+        except Exception:
+            return False
+        return True
+
     async def query_batch(
         self,
         requests: List[QueryRequest]
     ) -> List[ModelResponse]:
-        """Batch queries with rate limiting"""
+        """Batch queries; pacing is handled by the shared rate limiter"""
         results = []
         
         for request in requests:
@@ -150,9 +556,6 @@ class ModelClient:
                 )
                 results.append(response)
                 
-                # Rate limiting delay
-                await asyncio.sleep(1.0)
-                
             except Exception as e:
                 print(f"Failed to process request for {request.model}: {e}")
                 # Add a placeholder response or handle as needed
@@ -162,9 +565,33 @@ class ModelClient:
     
     @asynccontextmanager
     async def batch_context(self):
-        """Context manager for batch operations"""
-        yield self
+        """Context manager for batch operations; closes pooled connections on exit"""
+        try:
+            yield self
+        finally:
+            self.metrics.write_prometheus()
+            await self.aclose()
+
+
+_client: Optional[ModelClient] = None
+
+
+def get_client() -> ModelClient:
+    """The shared ModelClient, built on first use (reads config and API keys then)"""
+    global _client
+    if _client is None:
+        _client = ModelClient()
+    return _client
+
+
+def set_client(model_client: Optional[ModelClient]):
+    """Replace the shared client (e.g. with one pointed at a mock provider); None resets it"""
+    global _client
+    _client = model_client
 
 
-# Global client instance
-client = ModelClient()
\ No newline at end of file
+def __getattr__(name: str):
+    # `from api_client import client` keeps working, building the client on access
+    if name == "client":
+        return get_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -0,0 +1,103 @@
+from typing import Dict, Optional
+
+import numpy as np
+
+
+def bootstrap_rankings(
+    scores: np.ndarray,
+    totals: Optional[np.ndarray] = None,
+    num_resamples: int = 10000,
+    confidence: float = 0.95,
+    resample_runs: bool = True,
+    seed: Optional[int] = 0
+) -> Dict[str, np.ndarray]:
+    """Vectorized bootstrap of model means over scenarios (and judge runs)
+
+    `scores` is a (models, scenarios, runs) array of run total scores, NaN
+    where a model has no evaluation or fewer runs. `totals`, if given, is a
+    (models, scenarios) array of the score each evaluation is ranked on (NaN
+    where missing); it replaces the run mean as the cell value so the
+    bootstrap centres on the reported score, while the runs still supply the
+    judge-run variance. Each resample draws the
+    scenarios with replacement; the draws become a (resamples, scenarios)
+    count matrix, so every model's resampled mean comes out of one matrix
+    product rather than a resamples x models x scenarios gather.
+
+    Judge-run resampling adds, per resample and model, Gaussian noise with
+    the variance that resampling each selected scenario's runs would give
+    (population run variance / runs). It matches the first two moments of
+    the nested bootstrap without materialising it.
+
+    Returns per-model `mean`, `ci_low`, `ci_high`, a `win_probability`
+    matrix (P[row model scores above column model], ties count half) and a
+    `rank_distribution` matrix (P[model has rank r + 1], tied models ordered
+    at random within each resample).
+    """
+    num_models, num_scenarios, _ = scores.shape
+    rng = np.random.default_rng(seed)
+
+    observed = ~np.isnan(scores)
+    runs_per_cell = observed.sum(axis=2)
+    has_cell = runs_per_cell > 0
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cell_means = np.where(has_cell, np.nansum(scores, axis=2) / runs_per_cell, 0.0)
+        cell_var = np.where(
+            has_cell,
+            np.nansum((scores - cell_means[:, :, None]) ** 2, axis=2) / runs_per_cell,
+            0.0
+        )
+        mean_var = np.where(has_cell, cell_var / np.maximum(runs_per_cell, 1), 0.0)
+
+    if totals is not None:
+        has_cell = ~np.isnan(totals)
+        cell_means = np.where(has_cell, totals, 0.0)
+
+    # (resamples, scenarios) counts of how often each scenario was drawn
+    draws = rng.integers(0, num_scenarios, size=(num_resamples, num_scenarios))
+    offsets = (np.arange(num_resamples) * num_scenarios)[:, None]
+    weights = np.bincount(
+        (draws + offsets).ravel(), minlength=num_resamples * num_scenarios
+    ).reshape(num_resamples, num_scenarios).astype(float)
+
+    mask = has_cell.astype(float)
+    totals = weights @ cell_means.T
+    counts = weights @ mask.T
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = totals / counts
+        if resample_runs:
+            noise_sd = np.sqrt((weights ** 2) @ mean_var.T) / counts
+            means = means + rng.standard_normal(means.shape) * np.nan_to_num(noise_sd)
+
+    alpha = (1 - confidence) / 2
+    ci_low, ci_high = np.nanquantile(means, [alpha, 1 - alpha], axis=0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        observed_means = (cell_means * mask).sum(axis=1) / mask.sum(axis=1)
+
+    # Pairwise P(A > B) with ties counted half; NaN resamples lose
+    filled = np.nan_to_num(means, nan=-np.inf)
+    win_probability = np.empty((num_models, num_models))
+    for m in range(num_models):
+        column = filled[:, m:m + 1]
+        win_probability[m] = (column > filled).mean(axis=0) + 0.5 * (column == filled).mean(axis=0)
+    np.fill_diagonal(win_probability, 0.5)
+
+    # Rank 1 = highest mean; rank_distribution[m, r] = P(model m has rank r + 1).
+    # Ties are broken by a random key rather than model order
+    order = np.lexsort((rng.random(filled.shape), -filled))
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(num_models)[None, :], axis=1)
+    rank_distribution = np.bincount(
+        (ranks + np.arange(num_models)[None, :] * num_models).ravel(),
+        minlength=num_models * num_models
+    ).reshape(num_models, num_models) / num_resamples
+
+    return {
+        "mean": observed_means,
+        "ci_low": ci_low,
+        "ci_high": ci_high,
+        "win_probability": win_probability,
+        "rank_distribution": rank_distribution
+    }
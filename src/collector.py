@@ -1,8 +1,12 @@
+import os
 import json
 import asyncio
+import hashlib
 import sys
+import tempfile
+from datetime import datetime
 from pathlib import Path
-from typing import List
+from typing import List, Dict, Any, Awaitable, Callable, Optional, Tuple
 import yaml
 
 # Add project root to Python path
@@ -10,8 +14,15 @@ project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 sys.path.insert(0, str(project_root / "src"))
 
-from api_client import client
+from api_client import ModelClient, get_client
 from models import ModelName, Scenario, ScenarioCategory, Message, Conversation, ModelResponse
+from conversation_archive import ConversationArchive
+from usage_ledger import usage_context, BudgetExceeded
+from work_ledger import WorkLedger
+
+
+# Completed steps of a conversation, in call order, as stored in its checkpoint
+CHECKPOINT_STEPS = ("turn1", "turn2_user_response", "turn2", "turn3_user_response", "turn3")
 
 
 def load_config():
@@ -24,10 +35,22 @@ def load_config():
 class ConversationCollector:
     """Collects 3-turn conversations from test models"""
 
-    def __init__(self):
+    def __init__(self, client: Optional[ModelClient] = None):
         config = load_config()
         self.test_models = [ModelName(m) for m in config["test_models"]]
         self.generator_model = ModelName.QWEN_72B
+        self.max_conversations = config.get("concurrency", {}).get("max_conversations", 10)
+        packed = config.get("storage", {}).get("format", "files") == "packed"
+        self.archive = ConversationArchive() if packed else None
+        self.checkpoint_dir = Path(config.get("conversation", {}).get("checkpoint_dir", "data/checkpoints"))
+        self._client = client
+
+    @property
+    def client(self) -> ModelClient:
+        """The injected client, or the shared one built on first use"""
+        if self._client is None:
+            self._client = get_client()
+        return self._client
     
     async def generate_turn2_user_response(
         self, 
@@ -53,7 +76,8 @@ Requirements for user response:
 Generate only as user response, no other text."""
         
         messages = [Message(role="user", content=prompt)]
-        response = await client.query(self.generator_model, messages, max_tokens=500)
+        with usage_context(phase="user-turn", turn=2):
+            response = await self.client.query(self.generator_model, messages, max_tokens=500)
         return response.content.strip()
     
     async def collect_all_conversations(self, scenarios: List[Scenario]) -> List[Conversation]:
@@ -71,8 +95,7 @@ Generate only as user response, no other text."""
                 print(f"  [{completed}/{total_expected}] {model.value}...", end=" ")
                 
                 # Check if already exists
-                filename = Path(f"data/responses/{model.value}/{scenario.id}.json")
-                if filename.exists():
+                if self.has_conversation(model, scenario.id):
                     print(f"✓ already exists, skipping")
                     continue
                 
@@ -85,49 +108,158 @@ Generate only as user response, no other text."""
                     
                     print("✓ completed")
                     
-                    # Delay between conversations to avoid rate limits
-                    await asyncio.sleep(2.0)
-                    
+                except BudgetExceeded as e:
+                    print(f"\n💸 Budget reached, stopping collection: {e}")
+                    return all_conversations
                 except Exception as e:
                     print(f"✗ failed: {e}")
                     continue
         
         return all_conversations
+
+    async def collect_all_conversations_concurrent(
+        self,
+        scenarios: List[Scenario],
+        on_conversation: Optional[Callable[[Conversation], Awaitable[Any]]] = None
+    ) -> List[Conversation]:
+        """Collect conversations concurrently, capped per provider by the API client
+
+        on_conversation is awaited with each conversation once it is saved; a
+        slow callback holds its collection slot, which gives callers backpressure.
+        """
+
+        pending = [
+            (scenario, model)
+            for scenario in scenarios
+            for model in self.test_models
+            if not self.has_conversation(model, scenario.id)
+        ]
+        total_expected = len(scenarios) * len(self.test_models)
+        print(f"  {total_expected - len(pending)}/{total_expected} already exist, collecting {len(pending)}")
+
+        # Provider limits live in the client; this only bounds conversations in flight
+        in_flight = asyncio.Semaphore(self.max_conversations)
+        completed = 0
+        budget_stop: List[BudgetExceeded] = []
+
+        async def collect_one(scenario: Scenario, model: ModelName):
+            nonlocal completed
+            async with in_flight:
+                if budget_stop:
+                    return None
+                try:
+                    conversation = await self.run_conversation(scenario, model)
+                    # Save immediately to avoid data loss
+                    self.save_conversation(conversation)
+                except BudgetExceeded as e:
+                    # In-flight conversations are dropped; queued ones never start
+                    budget_stop.append(e)
+                    return None
+                except Exception as e:
+                    completed += 1
+                    print(f"  [{completed}/{len(pending)}] ✗ {model.value} - {scenario.id} failed: {e}")
+                    return None
+
+                completed += 1
+                print(f"  [{completed}/{len(pending)}] ✓ {model.value} - {scenario.id}")
+
+                if on_conversation is not None:
+                    await on_conversation(conversation)
+                return conversation
+
+        results = await asyncio.gather(*(collect_one(s, m) for s, m in pending))
+        if budget_stop:
+            print(f"  💸 Budget reached, stopped collection: {budget_stop[0]}")
+        return [c for c in results if c is not None]
     
+    def seed_ledger(self, scenarios: List[Scenario], ledger: WorkLedger) -> int:
+        """Register every scenario x test model unit, marking saved conversations done"""
+        return ledger.seed(
+            [(model.value, s.id) for s in scenarios for model in self.test_models],
+            lambda model, scenario_id: self.has_conversation(ModelName(model), scenario_id)
+        )
+
+    async def collect_with_ledger(
+        self,
+        scenarios: List[Scenario],
+        ledger: WorkLedger,
+        shard: Optional[Tuple[int, int]] = None,
+        concurrency: int = 1
+    ) -> Dict[str, int]:
+        """Collect the units this worker claims from a shared work ledger
+
+        Other processes (or machines) draining the same ledger get disjoint
+        units; `shard` restricts this worker to one slice of them.
+        """
+        scenario_map = {s.id: s for s in scenarios}
+        self.seed_ledger(scenarios, ledger)
+
+        async def collect_unit(model: str, scenario_id: str):
+            conversation = await self.run_conversation(scenario_map[scenario_id], ModelName(model))
+            self.save_conversation(conversation)
+            print(f"  ✓ {model} - {scenario_id} [{ledger.worker_id}]")
+
+        return await ledger.drain(collect_unit, concurrency, shard)
+
     async def run_conversation(
         self, 
         scenario: Scenario, 
         model_name: ModelName
     ) -> Conversation:
-        """Run a 3-turn conversation with a model"""
-        
-        # Turn 1: Initial response to scenario
-        turn1_messages = [Message(role="user", content=scenario.prompt)]
-        turn1 = await client.query(model_name, turn1_messages)
-        
-        # Turn 2: Generate dynamic user response
-        turn2_user_content = await self.generate_turn2_user_response(turn1.content, scenario.prompt)
-        
-        turn2_messages = [
-            Message(role="user", content=scenario.prompt),
-            Message(role="assistant", content=turn1.content),
-            Message(role="user", content=turn2_user_content)
-        ]
-        turn2 = await client.query(model_name, turn2_messages)
-        
-        # Turn 3: Contextual deepening
-        turn3_prompt = await self.generate_turn3_prompt(
-            scenario, turn1.content, turn2.content
-        )
-        
-        turn3_messages = [
-            Message(role="user", content=scenario.prompt),
-            Message(role="assistant", content=turn1.content),
-            Message(role="user", content=turn2_user_content),
-            Message(role="assistant", content=turn2.content),
-            Message(role="user", content=turn3_prompt)
-        ]
-        turn3 = await client.query(model_name, turn3_messages)
+        """Run a 3-turn conversation with a model
+
+        Each of the five calls is checkpointed as it completes, so a
+        conversation that failed part-way resumes from its last completed step.
+        """
+
+        steps = self.load_checkpoint(scenario, model_name)
+        if steps:
+            print(f"  ↪ Resuming {model_name.value} - {scenario.id} after "
+                  f"{len(steps)}/{len(CHECKPOINT_STEPS)} steps")
+
+        async def step(name: str, call: Callable[[], Awaitable[Any]]) -> Any:
+            """Run one step unless the checkpoint already has its result"""
+            if name in steps:
+                value = steps[name]
+                return value if isinstance(value, str) else ModelResponse(**value)
+            result = await call()
+            steps[name] = result if isinstance(result, str) else result.model_dump(mode="json")
+            self.save_checkpoint(scenario, model_name, steps)
+            return result
+
+        # Every call below is recorded in the usage ledger under this model and scenario
+        with usage_context(phase="collect", model=model_name.value, scenario=scenario.id):
+            # Turn 1: Initial response to scenario
+            turn1_messages = [Message(role="user", content=scenario.prompt)]
+            turn1 = await step("turn1", lambda: self._query_turn(model_name, turn1_messages, 1))
+
+            # Turn 2: Generate dynamic user response
+            turn2_user_content = await step(
+                "turn2_user_response",
+                lambda: self.generate_turn2_user_response(turn1.content, scenario.prompt)
+            )
+
+            turn2_messages = [
+                Message(role="user", content=scenario.prompt),
+                Message(role="assistant", content=turn1.content),
+                Message(role="user", content=turn2_user_content)
+            ]
+            turn2 = await step("turn2", lambda: self._query_turn(model_name, turn2_messages, 2))
+
+            # Turn 3: Contextual deepening
+            turn3_prompt = await step(
+                "turn3_user_response",
+                lambda: self.generate_turn3_prompt(scenario, turn1.content, turn2.content)
+            )
+
+            turn3_messages = [
+                Message(role="user", content=scenario.prompt),
+                Message(role="assistant", content=turn1.content),
+                Message(role="user", content=turn2_user_content),
+                Message(role="assistant", content=turn2.content),
+                Message(role="user", content=turn3_prompt)
+            ]
+            turn3 = await step("turn3", lambda: self._query_turn(model_name, turn3_messages, 3))
 
         return Conversation(
             scenario_id=scenario.id,
@@ -138,6 +270,10 @@ Generate only as user response, no other text."""
             turn2_user_response=turn2_user_content,
             turn3_user_response=turn3_prompt
         )
+
+    async def _query_turn(self, model_name: ModelName, messages: List[Message], turn: int) -> ModelResponse:
+        with usage_context(turn=turn):
+            return await self.client.query(model_name, messages)
     
     async def generate_turn3_prompt(
         self,
@@ -172,23 +308,94 @@ Generate a realistic, authentic user response that:
 Response only, no explanation."""
 
         messages = [Message(role="user", content=prompt)]
-        response = await client.query(self.generator_model, messages, max_tokens=500)
+        with usage_context(phase="user-turn", turn=3):
+            response = await self.client.query(self.generator_model, messages, max_tokens=500)
         return response.content.strip()
     
+    def conversation_path(self, model: ModelName, scenario_id: str) -> Path:
+        """Path of the saved conversation for a model and scenario"""
+        return Path(f"data/responses/{model.value}/{scenario_id}.json")
+
+    def has_conversation(self, model: ModelName, scenario_id: str) -> bool:
+        """Whether a conversation for this model and scenario is already saved"""
+        if self.archive is not None:
+            return self.archive.contains(model.value, scenario_id)
+        return self.conversation_path(model, scenario_id).exists()
+
+    def checkpoint_path(self, model: ModelName, scenario_id: str) -> Path:
+        """Path of the partial-conversation checkpoint for a model and scenario"""
+        return self.checkpoint_dir / model.value / f"{scenario_id}.json"
+
+    @staticmethod
+    def _prompt_digest(scenario: Scenario) -> str:
+        return hashlib.sha256(scenario.prompt.encode("utf-8")).hexdigest()[:16]
+
+    def load_checkpoint(self, scenario: Scenario, model: ModelName) -> Dict[str, Any]:
+        """Completed steps saved for this conversation (empty if none or stale)"""
+        path = self.checkpoint_path(model, scenario.id)
+        try:
+            with open(path, "r") as f:
+                checkpoint = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except json.JSONDecodeError:
+            print(f"  ⚠️  Ignoring unreadable checkpoint {path}")
+            return {}
+
+        # A regenerated scenario invalidates the turns collected for the old prompt
+        if checkpoint.get("prompt_sha256") != self._prompt_digest(scenario):
+            print(f"  ⚠️  Scenario {scenario.id} changed since its checkpoint, starting over")
+            return {}
+        return checkpoint.get("steps", {})
+
+    def save_checkpoint(self, scenario: Scenario, model: ModelName, steps: Dict[str, Any]):
+        """Persist the completed steps (temp file + rename, so a crash never leaves half a checkpoint)"""
+        path = self.checkpoint_path(model, scenario.id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        checkpoint = {
+            "scenario_id": scenario.id,
+            "model": model.value,
+            "prompt_sha256": self._prompt_digest(scenario),
+            "updated_at": datetime.now().isoformat(),
+            "steps": steps
+        }
+
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(checkpoint, f, default=str)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def clear_checkpoint(self, model: ModelName, scenario_id: str):
+        """Drop the checkpoint once the full conversation is saved"""
+        try:
+            self.checkpoint_path(model, scenario_id).unlink()
+        except FileNotFoundError:
+            pass
+
     def save_conversation(self, conversation: Conversation):
-        """Save a single conversation to file"""
-        model_dir = Path(f"data/responses/{conversation.model.value}")
-        model_dir.mkdir(parents=True, exist_ok=True)
-
-        filename = model_dir / f"{conversation.scenario_id}.json"
-
-        with open(filename, "w") as f:
-            # Use model_dump() for Pydantic v2, or dict() for v1
-            try:
-                data = conversation.model_dump()
-            except AttributeError:
-                data = conversation.dict()
-            json.dump(data, f, indent=2, default=str)
+        """Save a single conversation to file (or the packed archive)"""
+        # Use model_dump() for Pydantic v2, or dict() for v1
+        try:
+            data = conversation.model_dump()
+        except AttributeError:
+            data = conversation.dict()
+
+        if self.archive is not None:
+            self.archive.append(data)
+        else:
+            filename = self.conversation_path(conversation.model, conversation.scenario_id)
+            filename.parent.mkdir(parents=True, exist_ok=True)
+
+            with open(filename, "w") as f:
+                json.dump(data, f, indent=2, default=str)
+
+        self.clear_checkpoint(conversation.model, conversation.scenario_id)
     
     def load_scenarios(self, filename="data/scenarios.json"):
         """Load scenarios from file"""
@@ -211,7 +418,8 @@ async def main():
     print("  Testing models: Claude 3.5 Sonnet (Free Web), ChatGPT 4o Mini (Free Web), Gemini 2.0 Flash (Free Web)")
     print()
     
-    conversations = await collector.collect_all_conversations(scenarios)
+    async with collector.client.batch_context():
+        conversations = await collector.collect_all_conversations(scenarios)
     
     print(f"\n  Collected {len(conversations)} conversations")
     print("  Responses saved to: data/responses/[model]/")
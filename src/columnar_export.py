@@ -0,0 +1,155 @@
+import json
+import argparse
+from pathlib import Path
+from typing import Dict, Any, List, Iterable, Optional
+
+SCORING_DIMENSIONS = [
+    "evokes_awareness",
+    "active_listening_indicators",
+    "maintains_client_agency",
+    "question_depth_progression",
+    "client_centered_communication",
+    "ethical_boundaries"
+]
+
+MOMENT_FIELDS = [
+    "stayed_in_inquiry",
+    "slipped_to_advice",
+    "slipped_to_therapy",
+    "slipped_to_consulting"
+]
+
+# Columns Analyzer.load_data() reads from evaluations.parquet; the free-text
+# judge output lives in other columns and is never decoded for analysis
+ANALYSIS_COLUMNS = (
+    ["model", "scenario_id", "category", "run_id", "total_mean", "total_std"]
+    + SCORING_DIMENSIONS
+    + [f"mean_{dim}" for dim in SCORING_DIMENSIONS]
+)
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Parquet export needs pyarrow: pip install pyarrow") from e
+    return pyarrow, pyarrow.parquet
+
+
+def evaluation_rows(
+    evaluations: Iterable[Dict[str, Any]],
+    category_by_scenario: Dict[str, str]
+) -> List[Dict[str, Any]]:
+    """Flatten evaluations into one row per judge run (single-run evaluations give one row)"""
+    rows = []
+    for evaluation in evaluations:
+        aggregated = evaluation.get("aggregated")
+        runs = evaluation.get("runs") or [dict(evaluation, run_id=1)]
+
+        for run in runs:
+            row = {
+                "model": evaluation["model"],
+                "scenario_id": evaluation["scenario_id"],
+                "category": category_by_scenario.get(evaluation["scenario_id"], "unknown"),
+                "run_id": run.get("run_id", 1),
+                "total_score": sum(run["scores"][dim] for dim in SCORING_DIMENSIONS),
+                "total_mean": aggregated["total_mean"] if aggregated else evaluation["total_score"],
+                "total_std": aggregated["total_std"] if aggregated else None,
+                "evaluated_at": str(run.get("evaluated_at", evaluation.get("evaluated_at", ""))),
+                "qualitative_assessment": run.get("qualitative_assessment", ""),
+                "strong_examples": list(run.get("strong_examples", [])),
+                "weak_examples": list(run.get("weak_examples", [])),
+                "contra_evidence": list(run.get("contra_evidence", []))
+            }
+            mean_scores = aggregated["mean_scores"] if aggregated else evaluation["scores"]
+            for dim in SCORING_DIMENSIONS:
+                row[dim] = run["scores"][dim]
+                row[f"mean_{dim}"] = mean_scores[dim]
+            moments = run.get("coaching_vs_advice_moments") or {}
+            for field in MOMENT_FIELDS:
+                row[field] = moments.get(field, 0)
+            rows.append(row)
+    return rows
+
+
+def conversation_rows(base_path: Path = Path("data/responses")) -> List[Dict[str, Any]]:
+    """One row of metadata per model turn of every saved conversation (no message text)"""
+    rows = []
+    for file_path in sorted(Path(base_path).glob("*/*.json")):
+        with open(file_path, "r") as f:
+            data = json.load(f)
+
+        for turn_number in (1, 2, 3):
+            turn = data.get(f"turn{turn_number}") or {}
+            usage = turn.get("usage") or {}
+            user_response = data.get(f"turn{turn_number}_user_response", "") if turn_number > 1 else ""
+            rows.append({
+                "model": data["model"],
+                "scenario_id": data["scenario_id"],
+                "turn": turn_number,
+                "response_chars": len(turn.get("content", "")),
+                "user_response_chars": len(user_response),
+                "prompt_tokens": usage.get("prompt_tokens"),
+                "completion_tokens": usage.get("completion_tokens"),
+                "response_time_ms": turn.get("response_time_ms"),
+                "time_to_first_token_ms": turn.get("time_to_first_token_ms"),
+                "tokens_per_second": turn.get("tokens_per_second"),
+                "timestamp": str(turn.get("timestamp", ""))
+            })
+    return rows
+
+
+def write_parquet(rows: List[Dict[str, Any]], path: str):
+    """Write rows to a compressed Parquet file"""
+    pa, pq = _require_pyarrow()
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    pq.write_table(pa.Table.from_pylist(rows), path, compression="zstd")
+
+
+def export_evaluations(
+    evaluations: Iterable[Dict[str, Any]],
+    scenarios: Iterable[Dict[str, Any]],
+    path: str = "data/evaluations.parquet"
+) -> int:
+    category_by_scenario = {s["id"]: s["category"] for s in scenarios}
+    rows = evaluation_rows(evaluations, category_by_scenario)
+    write_parquet(rows, path)
+    return len(rows)
+
+
+def export_conversations(
+    base_path: Path = Path("data/responses"),
+    path: str = "data/conversations.parquet"
+) -> int:
+    rows = conversation_rows(base_path)
+    write_parquet(rows, path)
+    return len(rows)
+
+
+def read_analysis_columns(path: str = "data/evaluations.parquet", columns: Optional[List[str]] = None):
+    """Read only the numeric/key columns the Analyzer needs, as NumPy arrays"""
+    _, pq = _require_pyarrow()
+    table = pq.read_table(path, columns=columns or ANALYSIS_COLUMNS)
+    return {name: table[name].to_numpy(zero_copy_only=False) for name in table.column_names}
+
+
+def main():
+    """Export evaluations and conversation metadata to Parquet"""
+    parser = argparse.ArgumentParser(description="Export evaluations and conversation turns to Parquet")
+    parser.add_argument("--evaluations", default="data/evaluations.json")
+    parser.add_argument("--scenarios", default="data/scenarios.json")
+    parser.add_argument("--responses", default="data/responses")
+    args = parser.parse_args()
+
+    with open(args.evaluations, "r") as f:
+        evaluations = json.load(f)
+    with open(args.scenarios, "r") as f:
+        scenarios = json.load(f)
+
+    print(f"Exported {export_evaluations(evaluations, scenarios)} judge runs to data/evaluations.parquet")
+    print(f"Exported {export_conversations(Path(args.responses))} turns to data/conversations.parquet")
+
+
+if __name__ == "__main__":
+    main()
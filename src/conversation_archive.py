@@ -0,0 +1,216 @@
+import os
+import json
+import mmap
+import argparse
+from pathlib import Path
+from typing import Dict, Any, List, Iterator, Optional, Tuple
+import yaml
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+from models import ModelName
+
+CONFIG_PATH = Path(__file__).parent.parent / "config" / "models.yaml"
+
+
+def storage_format(config_path: Path = CONFIG_PATH) -> str:
+    """'files' (one JSON file per conversation) or 'packed' (ConversationArchive)"""
+    with open(config_path, "r") as f:
+        config = yaml.safe_load(f)
+    return config.get("storage", {}).get("format", "files")
+
+
+class ModelPack:
+    """One model's conversations: an append-only `<model>.pack` of JSON lines
+    plus an append-only `<model>.idx` of `scenario_id<TAB>offset<TAB>length` lines
+
+    The index is loaded into a dict, so lookups are O(1); the pack is read
+    through an mmap. Re-appending a scenario supersedes the earlier record.
+    """
+
+    def __init__(self, base_path: Path, model: str):
+        self.model = model
+        self.pack_path = Path(base_path) / f"{model}.pack"
+        self.index_path = Path(base_path) / f"{model}.idx"
+        self.index: Dict[str, Tuple[int, int]] = {}
+        self._mmap: Optional[mmap.mmap] = None
+        self._load_index()
+
+    def _load_index(self):
+        end = 0
+        if self.index_path.exists():
+            with open(self.index_path, "r") as f:
+                for line in f:
+                    parts = line.rstrip("\n").split("\t")
+                    if len(parts) != 3:
+                        continue  # truncated by an interrupted append
+                    offset, length = int(parts[1]), int(parts[2])
+                    self.index[parts[0]] = (offset, length)
+                    end = max(end, offset + length)
+
+        # Records appended after the last index write (crash between the two)
+        if self.pack_path.exists() and self.pack_path.stat().st_size > end:
+            self._recover(end)
+
+    def _recover(self, start: int):
+        recovered = []
+        with open(self.pack_path, "rb") as f:
+            f.seek(start)
+            offset = start
+            for line in f:
+                if line.endswith(b"\n"):
+                    try:
+                        recovered.append((_loads(line)["scenario_id"], offset, len(line)))
+                    except (ValueError, KeyError):
+                        pass
+                offset += len(line)
+        if recovered:
+            self._write_index(recovered)
+
+    def _write_index(self, entries: List[Tuple[str, int, int]]):
+        with open(self.index_path, "a") as f:
+            for scenario_id, offset, length in entries:
+                f.write(f"{scenario_id}\t{offset}\t{length}\n")
+                self.index[scenario_id] = (offset, length)
+
+    def _view(self) -> Optional[mmap.mmap]:
+        if self._mmap is None and self.pack_path.exists() and self.pack_path.stat().st_size:
+            with open(self.pack_path, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    def __contains__(self, scenario_id: str) -> bool:
+        return scenario_id in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def get(self, scenario_id: str) -> Optional[Dict[str, Any]]:
+        entry = self.index.get(scenario_id)
+        if entry is None:
+            return None
+        offset, length = entry
+        return _loads(self._view()[offset:offset + length])
+
+    def append(self, data: Dict[str, Any]):
+        import fcntl  # POSIX only; imported here so reading archives works everywhere
+
+        record = json.dumps(data, separators=(",", ":"), default=str).encode("utf-8") + b"\n"
+
+        fd = os.open(self.pack_path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            # Several workers may append to the same pack; hold the lock until
+            # the offset is indexed so offsets and index lines stay in step
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            offset = os.fstat(fd).st_size
+            # Skip past a partial record left by an interrupted append
+            if offset and os.pread(fd, 1, offset - 1) != b"\n":
+                os.write(fd, b"\n")
+                offset += 1
+            os.write(fd, record)
+            os.fsync(fd)
+            self._write_index([(data["scenario_id"], offset, len(record))])
+        finally:
+            os.close(fd)  # releases the lock
+
+        self.close()  # the mmap no longer covers the whole file
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Current records in pack order, sliced from one mmap"""
+        view = self._view()
+        for offset, length in sorted(self.index.values()):
+            yield _loads(view[offset:offset + length])
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+
+class ConversationArchive:
+    """Packed conversation storage under data/responses (one ModelPack per model)"""
+
+    def __init__(self, base_path: Path = Path("data/responses")):
+        self.base_path = Path(base_path)
+        self._packs: Dict[str, ModelPack] = {}
+
+    def pack(self, model: str) -> ModelPack:
+        if model not in self._packs:
+            self.base_path.mkdir(parents=True, exist_ok=True)
+            self._packs[model] = ModelPack(self.base_path, model)
+        return self._packs[model]
+
+    def models(self) -> List[str]:
+        """Models with a pack file, in ModelName order"""
+        return [m.value for m in ModelName if (self.base_path / f"{m.value}.pack").exists()]
+
+    def contains(self, model: str, scenario_id: str) -> bool:
+        return scenario_id in self.pack(model)
+
+    def get(self, model: str, scenario_id: str) -> Optional[Dict[str, Any]]:
+        return self.pack(model).get(scenario_id)
+
+    def append(self, data: Dict[str, Any]):
+        self.pack(data["model"]).append(data)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for model in self.models():
+            yield from self.pack(model)
+
+    def close(self):
+        for pack in self._packs.values():
+            pack.close()
+
+
+def pack_directory(base_path: Path = Path("data/responses")) -> int:
+    """Append every data/responses/<model>/*.json conversation to the archive"""
+    archive = ConversationArchive(base_path)
+    count = 0
+    for model in ModelName:
+        model_dir = Path(base_path) / model.value
+        if not model_dir.is_dir():
+            continue
+        pack = archive.pack(model.value)
+        for file_path in sorted(model_dir.glob("*.json")):
+            data = _loads(file_path.read_bytes())
+            if data["scenario_id"] not in pack:
+                pack.append(data)
+                count += 1
+    archive.close()
+    return count
+
+
+def unpack_archive(base_path: Path = Path("data/responses")) -> int:
+    """Write every archived conversation back to data/responses/<model>/<scenario_id>.json"""
+    archive = ConversationArchive(base_path)
+    count = 0
+    for data in archive:
+        file_path = Path(base_path) / data["model"] / f"{data['scenario_id']}.json"
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(file_path, "w") as f:
+            json.dump(data, f, indent=2)
+        count += 1
+    archive.close()
+    return count
+
+
+def main():
+    """Convert between per-file conversations and the packed archive"""
+    parser = argparse.ArgumentParser(description="Convert data/responses between files and packed archives")
+    parser.add_argument("direction", choices=["pack", "unpack"])
+    parser.add_argument("--path", default="data/responses")
+    args = parser.parse_args()
+
+    if args.direction == "pack":
+        print(f"Packed {pack_directory(Path(args.path))} conversations into {args.path}/<model>.pack")
+        print("Set storage.format: packed in config/models.yaml to read and write the archive")
+    else:
+        print(f"Unpacked {unpack_archive(Path(args.path))} conversations into {args.path}/<model>/")
+
+
+if __name__ == "__main__":
+    main()
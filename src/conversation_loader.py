@@ -0,0 +1,125 @@
+import json
+import asyncio
+from collections import deque
+from itertools import islice
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Iterator, AsyncIterator, Optional, Tuple
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # stdlib parser is slower but equivalent
+    _loads = json.loads
+
+from models import ModelName, Conversation
+from conversation_archive import ConversationArchive, storage_format
+
+
+class ConversationLoader:
+    """Lazily loads saved conversations from data/responses/<model>/*.json
+
+    Files are read and parsed on a thread pool and yielded as they are
+    consumed, so evaluation starts on the first conversation instead of
+    after the whole directory has been loaded and validated. `async for`
+    does the reading and validation off the event loop. len() only
+    lists the files. With `storage.format: packed` the conversations are
+    read from the ConversationArchive instead.
+    """
+
+    def __init__(
+        self,
+        base_path: Path = Path("data/responses"),
+        max_workers: int = 8,
+        packed: Optional[bool] = None
+    ):
+        self.base_path = Path(base_path)
+        self.max_workers = max_workers
+        self.packed = storage_format() == "packed" if packed is None else packed
+
+    def paths(self) -> List[Path]:
+        """Conversation files of known models, without reading them"""
+        paths = []
+        if not self.base_path.exists():
+            return paths
+
+        for model_dir in sorted(self.base_path.iterdir()):
+            if not model_dir.is_dir():
+                continue
+            try:
+                ModelName(model_dir.name)
+            except ValueError:
+                continue
+            paths.extend(sorted(model_dir.glob("*.json")))
+        return paths
+
+    def __len__(self) -> int:
+        if self.packed:
+            archive = ConversationArchive(self.base_path)
+            return sum(len(archive.pack(model)) for model in archive.models())
+        return len(self.paths())
+
+    def keys(self) -> List[Tuple[str, str]]:
+        """(model, scenario_id) of every saved conversation, without reading them"""
+        if self.packed:
+            archive = ConversationArchive(self.base_path)
+            return [(model, scenario_id) for model in archive.models() for scenario_id in archive.pack(model).index]
+        return [(path.parent.name, path.stem) for path in self.paths()]
+
+    def get(self, model: str, scenario_id: str) -> Optional[Conversation]:
+        """One saved conversation, or None"""
+        if self.packed:
+            archive = ConversationArchive(self.base_path)
+            try:
+                data = archive.get(model, scenario_id)
+            finally:
+                archive.close()
+            return Conversation(**data) if data is not None else None
+
+        path = self.base_path / model / f"{scenario_id}.json"
+        return Conversation(**self._read(path)) if path.exists() else None
+
+    @staticmethod
+    def _read(path: Path) -> Dict[str, Any]:
+        return _loads(path.read_bytes())
+
+    def __iter__(self) -> Iterator[Conversation]:
+        if self.packed:
+            archive = ConversationArchive(self.base_path)
+            try:
+                for data in archive:
+                    yield Conversation(**data)
+            finally:
+                archive.close()
+            return
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            try:
+                # Reads run at most 2 * max_workers files ahead, in file order;
+                # Pydantic validation runs as each one is consumed
+                paths = iter(self.paths())
+                pending = deque(
+                    executor.submit(self._read, path) for path in islice(paths, 2 * self.max_workers)
+                )
+                while pending:
+                    data = pending.popleft().result()
+                    path = next(paths, None)
+                    if path is not None:
+                        pending.append(executor.submit(self._read, path))
+                    yield Conversation(**data)
+            finally:
+                # Stop reading ahead if the consumer stopped early
+                executor.shutdown(wait=True, cancel_futures=True)
+
+    async def __aiter__(self) -> AsyncIterator[Conversation]:
+        """Same order as iter(), with each step run in a thread so other tasks keep running"""
+        iterator = iter(self)
+        done = object()
+        try:
+            while True:
+                conversation = await asyncio.to_thread(next, iterator, done)
+                if conversation is done:
+                    return
+                yield conversation
+        finally:
+            await asyncio.to_thread(iterator.close)
@@ -0,0 +1,134 @@
+import os
+import json
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Dict, Any, List, Iterator, Optional
+
+
+class EvaluationStore:
+    """Append-only JSONL store of multi-run evaluations
+
+    Each evaluation is one line appended with a single write, so a crash can
+    at most leave a truncated last line (skipped on read) instead of a corrupt
+    file. `evaluations.json`, the format the Analyzer and docs/ site consume,
+    is produced from the store with export_json().
+    """
+
+    def __init__(
+        self,
+        path: str = "data/evaluations.jsonl",
+        legacy_path: Optional[str] = "data/evaluations.json"
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Seed the store once from an existing evaluations.json
+        if not self.path.exists() and legacy_path and Path(legacy_path).exists():
+            with open(legacy_path, "r") as f:
+                self._write_atomic(self.path, json.load(f))
+
+        self._keys = {self.key(e["model"], e["scenario_id"]) for e in self}
+
+    @staticmethod
+    def key(model: str, scenario_id: str) -> str:
+        return f"{model}_{scenario_id}"
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        if not self.path.exists():
+            return
+        with open(self.path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # Truncated line from an interrupted append
+                    continue
+
+    def contains(self, model: str, scenario_id: str) -> bool:
+        """Whether an evaluation for this model and scenario is already stored"""
+        return self.key(model, scenario_id) in self._keys
+
+    def append(self, evaluation: Dict[str, Any]):
+        """Durably append one evaluation"""
+        line = json.dumps(evaluation, default=str) + "\n"
+
+        fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            # Terminate a truncated last line so the new record stays parseable
+            size = os.fstat(fd).st_size
+            if size and os.pread(fd, 1, size - 1) != b"\n":
+                line = "\n" + line
+            os.write(fd, line.encode("utf-8"))
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+        self._keys.add(self.key(evaluation["model"], evaluation["scenario_id"]))
+
+    def load_all(self) -> List[Dict[str, Any]]:
+        """All stored evaluations, keeping the latest one per model and scenario"""
+        latest = {}
+        for evaluation in self:
+            latest[self.key(evaluation["model"], evaluation["scenario_id"])] = evaluation
+        return list(latest.values())
+
+    def export_json(
+        self,
+        path: str = "data/evaluations.json",
+        evaluations: Optional[List[Dict[str, Any]]] = None
+    ) -> int:
+        """Write the evaluations.json view consumed by the Analyzer and docs site"""
+        if evaluations is None:
+            evaluations = self.load_all()
+        self._write_atomic(Path(path), evaluations, indent=2)
+        return len(evaluations)
+
+    def compact(self) -> int:
+        """Rewrite the store without duplicates or truncated lines"""
+        evaluations = self.load_all()
+        self._write_atomic(self.path, evaluations)
+        return len(evaluations)
+
+    @staticmethod
+    def _write_atomic(path: Path, evaluations: List[Dict[str, Any]], indent: Optional[int] = None):
+        """Write to a temp file and rename over the target so readers never see a partial file"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                if indent is None:
+                    for evaluation in evaluations:
+                        f.write(json.dumps(evaluation, default=str) + "\n")
+                else:
+                    json.dump(evaluations, f, indent=indent, default=str)
+                f.flush()
+                os.fsync(f.fileno())
+            # mkstemp creates 0600 files; the exports are served by the docs site
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+def main():
+    """Export (and optionally compact) the evaluation store"""
+    parser = argparse.ArgumentParser(description="Export data/evaluations.jsonl to data/evaluations.json")
+    parser.add_argument("--compact", action="store_true", help="Also rewrite the JSONL store without duplicates")
+    args = parser.parse_args()
+
+    store = EvaluationStore()
+    if args.compact:
+        print(f"Compacted store to {store.compact()} evaluations")
+    print(f"Exported {store.export_json()} evaluations to data/evaluations.json")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,24 @@
 import json
 import asyncio
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple, Iterable, Optional
 from pathlib import Path
-import re
+from functools import lru_cache
 import numpy as np
+import yaml
 from datetime import datetime
+from pydantic import TypeAdapter
 
-from api_client import client
+from api_client import ModelClient, get_client
+from evaluation_store import EvaluationStore
+from conversation_loader import ConversationLoader
+from usage_ledger import usage_context, BudgetExceeded
+from work_ledger import WorkLedger
 from models import (
-    ModelName, Conversation, Evaluation, Scenario, Message
+    ModelName, Conversation, Evaluation, EvaluationScores, Scenario, Message
 )
 
 NUM_EVAL_RUNS = 3
+PARSE_ATTEMPTS = 3  # judge calls per run before an unparseable run fails the evaluation
 SCORING_DIMENSIONS = [
     "evokes_awareness",
     "active_listening_indicators",
@@ -22,6 +29,81 @@ SCORING_DIMENSIONS = [
 ]
 
 
+# Built once; validates parsed judge output into an Evaluation
+EVALUATION_ADAPTER = TypeAdapter(Evaluation)
+
+
+class EvaluationParseError(ValueError):
+    """The judge's response did not contain a valid evaluation"""
+
+
+def extract_json_object(text: str) -> Dict[str, Any]:
+    """First complete JSON object in a judge response (bare, fenced or inside prose)"""
+
+    # Fast paths: JSON-mode responses are bare objects; fenced ones have a single object
+    stripped = text.strip()
+    first, last = stripped.find("{"), stripped.rfind("}")
+    if first != -1 and last > first:
+        try:
+            data = json.loads(stripped[first:last + 1])
+            if isinstance(data, dict):
+                return data
+        except ValueError:
+            pass
+
+    # Single pass matching braces outside strings with a stack of open-brace
+    # offsets. A top-level candidate that fails to parse is skipped as a whole.
+    # Objects closed inside a brace that never closes (a stray "{" in prose
+    # before the real object) are kept and tried once the scan ends.
+    stack: List[int] = []
+    nested: List[Tuple[int, int, int]] = []  # (start, end, enclosing brace) of closed inner objects
+    in_string = escaped = False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = bool(stack)
+        elif ch == "{":
+            stack.append(i)
+        elif ch == "}" and stack:
+            start = stack.pop()
+            if stack:
+                nested.append((start, i, stack[-1]))
+                continue
+            try:
+                data = json.loads(text[start:i + 1])
+                if isinstance(data, dict):
+                    return data
+            except ValueError:
+                pass
+            nested.clear()  # everything so far lies inside a closed, rejected candidate
+
+    # Unclosed braces remain: try the outermost objects closed inside them, in order
+    unclosed = set(stack)
+    for start, end, parent in nested:
+        if parent in unclosed:
+            try:
+                data = json.loads(text[start:end + 1])
+                if isinstance(data, dict):
+                    return data
+            except ValueError:
+                pass
+
+    raise ValueError("no complete JSON object in response")
+
+
+def load_judging_config() -> Dict[str, Any]:
+    """The `judging` section of config/models.yaml"""
+    config_path = Path(__file__).parent.parent / "config" / "models.yaml"
+    with open(config_path, "r") as f:
+        return yaml.safe_load(f).get("judging", {})
+
+
 def to_dict(obj):
     """Recursively convert Pydantic objects to dicts"""
     if hasattr(obj, 'dict'):
@@ -36,12 +118,46 @@ def to_dict(obj):
         return obj
 
 
+def cached_prompt_tokens(usage: Dict[str, Any]) -> int:
+    """Prompt tokens served from the provider's prefix cache (DeepSeek or OpenAI-style usage)"""
+    if "prompt_cache_hit_tokens" in usage:
+        return usage["prompt_cache_hit_tokens"] or 0
+    return (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0) or 0
+
+
+@lru_cache(maxsize=None)
+def load_judge_instructions(path: str = "prompts/judge_prompt.txt") -> str:
+    """Load the judge rubric once per process"""
+    with open(path, "r") as f:
+        return f.read()
+
+
 class Judge:
     """Evaluates conversations using DeepSeek-V3"""
 
-    def __init__(self):
+    def __init__(self, client: Optional[ModelClient] = None, adaptive: Optional[bool] = None):
+        config = load_judging_config()
         self.judge_model = ModelName.DEEPSEEK_V3
-        self.num_runs = NUM_EVAL_RUNS
+        self.num_runs = config.get("num_runs", NUM_EVAL_RUNS)
+
+        # Adaptive judging: stop at min_runs when runs agree, escalate up to max_runs when not
+        self.adaptive = config.get("adaptive", False) if adaptive is None else adaptive
+        self.min_runs = config.get("min_runs", 2)
+        self.max_runs = config.get("max_runs", 5)
+        self.tolerance = config.get("tolerance", 0.5)
+        self.store = EvaluationStore()
+        self._client = client
+
+        # Judge input tokens seen / served from the provider prefix cache
+        self.prompt_tokens = 0
+        self.prompt_cache_hit_tokens = 0
+
+    @property
+    def client(self) -> ModelClient:
+        """The injected client, or the shared one built on first use"""
+        if self._client is None:
+            self._client = get_client()
+        return self._client
 
     async def evaluate_conversation(
         self,
@@ -50,10 +166,11 @@ class Judge:
     ) -> Evaluation:
         """Evaluate a full 3-turn conversation"""
 
-        eval_prompt = self._build_evaluation_prompt(scenario, conversation)
-
-        messages = [Message(role="user", content=eval_prompt)]
-        response = await client.query(self.judge_model, messages)
+        messages = self._build_evaluation_messages(scenario, conversation)
+        response = await self.client.query(
+            self.judge_model, messages, json_mode=True,
+            validate=lambda content: self._parse_evaluation(content, conversation.model, scenario.id)
+        )
 
         return self._parse_evaluation(response.content, conversation.model, scenario.id)
 
@@ -64,44 +181,33 @@ class Judge:
     ) -> Dict[str, Any]:
         """Evaluate a conversation multiple times and return aggregated results as plain dict"""
 
-        all_scores = []
-        all_runs = []
-
-        for run_idx in range(self.num_runs):
-            run_id = run_idx + 1
-            print(f"  Run {run_id}/{self.num_runs}...", end=" ")
-
-            eval_prompt = self._build_evaluation_prompt(scenario, conversation)
-            messages = [Message(role="user", content=eval_prompt)]
-            response = await client.query(self.judge_model, messages)
-
-            eval_result = self._parse_evaluation(response.content, conversation.model, scenario.id)
-
-            # Store scores (EvaluationScores object) for dimension calculations
-            all_scores.append(eval_result.scores)
-
-            # Store full evaluation result (convert Pydantic to dict)
-            # Calculate total_score from dimension scores to avoid LLM math errors
-            dimension_scores = to_dict(eval_result.scores)
-            calculated_total = sum(dimension_scores.values())
-            
-            all_runs.append({
-                "run_id": run_id,
-                "evaluated_at": datetime.now().isoformat(),
-                "scores": dimension_scores,
-                "total_score": calculated_total,
-                "coaching_vs_advice_moments": to_dict(eval_result.coaching_vs_advice_moments),
-                "qualitative_assessment": str(eval_result.qualitative_assessment),
-                "strong_examples": list(eval_result.strong_examples),
-                "weak_examples": list(eval_result.weak_examples),
-                "contra_evidence": list(eval_result.contra_evidence)
-            })
-
-            print("✓")
-
-            # Delay between runs to avoid rate limits
-            if run_idx < self.num_runs - 1:
-                await asyncio.sleep(1.0)
+        # The prompt is identical for every run, so build it once and
+        # dispatch the independent runs concurrently
+        messages = self._build_evaluation_messages(scenario, conversation)
+
+        with usage_context(phase="judge", model=conversation.model.value, scenario=scenario.id):
+            initial_runs = self.min_runs if self.adaptive else self.num_runs
+            runs = [
+                asyncio.ensure_future(self._judge_run(messages, conversation, scenario, run_id))
+                for run_id in range(1, initial_runs + 1)
+            ]
+            try:
+                results = list(await asyncio.gather(*runs))
+            except BaseException:
+                # One failed run fails the evaluation; stop paying for the others
+                for run in runs:
+                    run.cancel()
+                await asyncio.gather(*runs, return_exceptions=True)
+                raise
+
+            # Escalate one run at a time while the runs disagree
+            while self.adaptive and len(results) < self.max_runs and not self._runs_agree(results):
+                results.append(await self._judge_run(messages, conversation, scenario, len(results) + 1))
+
+        print(f"  ✓ {len(results)} judge runs ({conversation.model.value} - {scenario.id})")
+
+        all_scores = [scores for scores, _ in results]
+        all_runs = [run for _, run in results]
 
         # Calculate mean and std per dimension
         # Scores must be integers (1-5), so round means to nearest integer
@@ -128,7 +234,7 @@ class Judge:
             "strong_examples": all_runs[0]["strong_examples"],
             "weak_examples": all_runs[0]["weak_examples"],
             "contra_evidence": all_runs[0]["contra_evidence"],
-            "num_runs": self.num_runs,
+            "num_runs": len(all_runs),
             "temperature": 0,
             "runs": all_runs,
             "aggregated": {
@@ -138,19 +244,102 @@ class Judge:
                 "total_std": total_std
             }
         }
+        if self.adaptive:
+            result["run_policy"] = {
+                "adaptive": True,
+                "min_runs": self.min_runs,
+                "max_runs": self.max_runs,
+                "tolerance": self.tolerance
+            }
 
         return result
 
+    def _runs_agree(self, results: List[Tuple[EvaluationScores, Dict[str, Any]]]) -> bool:
+        """Whether the standard error of the run totals is within tolerance"""
+        totals = [run["total_score"] for _, run in results]
+        if len(totals) < 2:
+            return False
+        return float(np.std(totals, ddof=1)) / np.sqrt(len(totals)) <= self.tolerance
+
+    async def _judge_run(
+        self,
+        messages: List[Message],
+        conversation: Conversation,
+        scenario: Scenario,
+        run_id: int
+    ) -> Tuple[EvaluationScores, Dict[str, Any]]:
+        """Run the judge once and return its scores plus the stored run record"""
+
+        attempt_messages = messages
+        for attempt in range(1, PARSE_ATTEMPTS + 1):
+            # Each run is a separate sample, so cache them under separate keys
+            variant = f"run{run_id}" if attempt == 1 else f"run{run_id}-retry{attempt - 1}"
+            # Only replies that parse are cached; a malformed one is re-requested on the next pass
+            response = await self.client.query(
+                self.judge_model, attempt_messages, cache_variant=variant, json_mode=True,
+                validate=lambda content: self._parse_evaluation(content, conversation.model, scenario.id)
+            )
+
+            usage = {
+                "prompt_tokens": response.usage.get("prompt_tokens", 0),
+                "completion_tokens": response.usage.get("completion_tokens", 0),
+                "prompt_cache_hit_tokens": cached_prompt_tokens(response.usage)
+            }
+            self.prompt_tokens += usage["prompt_tokens"]
+            self.prompt_cache_hit_tokens += usage["prompt_cache_hit_tokens"]
+
+            try:
+                eval_result = self._parse_evaluation(response.content, conversation.model, scenario.id)
+                break
+            except EvaluationParseError as e:
+                if attempt == PARSE_ATTEMPTS:
+                    raise EvaluationParseError(
+                        f"run {run_id} unparseable after {PARSE_ATTEMPTS} attempts: {e}"
+                    ) from e
+                print(f"  ↻ Run {run_id} ({conversation.model.value} - {scenario.id}) unparseable ({e}), retrying")
+                # Re-ask only this run, pointing the judge at its malformed reply
+                attempt_messages = messages + [
+                    Message(role="assistant", content=response.content),
+                    Message(role="user", content="That reply was not a complete, valid JSON evaluation. "
+                                                 "Reply with only the JSON object in the requested format.")
+                ]
+
+        # Calculate total_score from dimension scores to avoid LLM math errors
+        dimension_scores = to_dict(eval_result.scores)
+        calculated_total = sum(dimension_scores.values())
+
+        return eval_result.scores, {
+            "run_id": run_id,
+            "evaluated_at": datetime.now().isoformat(),
+            "scores": dimension_scores,
+            "total_score": calculated_total,
+            "coaching_vs_advice_moments": to_dict(eval_result.coaching_vs_advice_moments),
+            "qualitative_assessment": str(eval_result.qualitative_assessment),
+            "strong_examples": list(eval_result.strong_examples),
+            "weak_examples": list(eval_result.weak_examples),
+            "contra_evidence": list(eval_result.contra_evidence),
+            "parse_attempts": attempt,
+            "usage": usage
+        }
+
+    def _build_evaluation_messages(
+        self,
+        scenario: Scenario,
+        conversation: Conversation
+    ) -> List[Message]:
+        """Build the judge messages: the static rubric leads as a system message so
+        the provider's prefix cache can reuse it across every judge call"""
+        return [
+            Message(role="system", content=load_judge_instructions()),
+            Message(role="user", content=self._build_evaluation_prompt(scenario, conversation))
+        ]
+
     def _build_evaluation_prompt(
         self,
         scenario: Scenario,
         conversation: Conversation
     ) -> str:
-        """Build the evaluation prompt for the judge"""
-
-        # Load judge prompt template
-        with open("prompts/judge_prompt.txt", "r") as f:
-            judge_instructions = f.read()
+        """Build the per-conversation part of the evaluation prompt"""
 
         # Handle both dict and ModelResponse objects
         def get_content(turn):
@@ -180,9 +369,7 @@ TURNS 3 - Model Response:
 {get_content(conversation.turn3)}
 """
 
-        full_prompt = f"{judge_instructions}\n\n## Conversation to Evaluate:\n{conversation_text}\n\nProvide your evaluation:"
-
-        return full_prompt
+        return f"## Conversation to Evaluate:\n{conversation_text}\n\nProvide your evaluation:"
 
     def _parse_evaluation(
         self,
@@ -190,22 +377,13 @@ TURNS 3 - Model Response:
         model: ModelName,
         scenario_id: str
     ) -> Evaluation:
-        """Parse the judge's response into an Evaluation object"""
+        """Parse the judge's response into an Evaluation object
 
-        try:
-            # Extract JSON from response
-            json_match = re.search(r'```json\n(.*?)\n```', response_content, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(1)
-            else:
-                # Try to find JSON without code blocks
-                json_match = re.search(r'\{.*\}', response_content, re.DOTALL)
-                if json_match:
-                    json_str = json_match.group(0)
-                else:
-                    raise ValueError("No JSON found in response")
+        Raises EvaluationParseError when the response holds no valid evaluation.
+        """
 
-            data = json.loads(json_str)
+        try:
+            data = extract_json_object(response_content)
 
             # Calculate total_score from individual scores if not provided by judge
             # This ensures consistency and avoids relying on potentially buggy LLM math
@@ -215,51 +393,16 @@ TURNS 3 - Model Response:
             else:
                 total_score = sum(scores.values())
 
-            # Create Evaluation object
-            return Evaluation(
-                model=model,
-                scenario_id=scenario_id,
-                scores=scores,
-                total_score=total_score,
-                coaching_vs_advice_moments=data["coaching_vs_advice_moments"],
-                qualitative_assessment=data["qualitative_assessment"],
-                strong_examples=data["strong_examples"],
-                weak_examples=data["weak_examples"],
-                contra_evidence=data["contra_evidence"]
+            return EVALUATION_ADAPTER.validate_python(
+                dict(data, model=model, scenario_id=scenario_id, total_score=total_score)
             )
 
-        except Exception as e:
-            print(f"Error parsing evaluation: {e}")
-            print(f"Raw response: {response_content}")
-
-            # Return a default/placeholder evaluation
-            return Evaluation(
-                model=model,
-                scenario_id=scenario_id,
-                scores={
-                    "evokes_awareness": 3,
-                    "active_listening_indicators": 3,
-                    "maintains_client_agency": 3,
-                    "question_depth_progression": 3,
-                    "client_centered_communication": 3,
-                    "ethical_boundaries": 3
-                },
-                total_score=18,
-                coaching_vs_advice_moments={
-                    "stayed_in_inquiry": 0,
-                    "slipped_to_advice": 0,
-                    "slipped_to_therapy": 0,
-                    "slipped_to_consulting": 0
-                },
-                qualitative_assessment="Evaluation parsing failed - manual review needed",
-                strong_examples=[],
-                weak_examples=[],
-                contra_evidence=["Parsing error occurred"]
-            )
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            raise EvaluationParseError(f"{type(e).__name__}: {e}") from e
 
     async def evaluate_all_conversations(
         self,
-        conversations: List[Conversation],
+        conversations: Iterable[Conversation],
         scenarios: List[Scenario]
     ) -> List[Dict]:
         """Evaluate all conversations with multi-run support and resumability"""
@@ -267,25 +410,16 @@ TURNS 3 - Model Response:
         # Create scenario lookup
         scenario_map = {s.id: s for s in scenarios}
 
-        # Load existing evaluations for resumability
-        existing_evals = {}
-        if Path("data/evaluations.json").exists():
-            with open("data/evaluations.json", "r") as f:
-                evals = json.load(f)
-                for eval_data in evals:
-                    key = f"{eval_data['model']}_{eval_data['scenario_id']}"
-                    existing_evals[key] = True
-
+        # Already-evaluated conversations are looked up in the store's key index
         evaluations = []
-        total_expected = len(conversations)
+        # Sized for lists and ConversationLoader; counting does not read the files
+        total_expected = len(conversations) if hasattr(conversations, "__len__") else "?"
         completed = 0
 
-        for idx, conversation in enumerate(conversations):
+        for conversation in conversations:
             completed += 1
-            key = f"{conversation.model.value}_{conversation.scenario_id}"
-
             # Skip if already evaluated
-            if key in existing_evals:
+            if self.store.contains(conversation.model.value, conversation.scenario_id):
                 print(f"[{completed}/{total_expected}] ✓ Skipping {conversation.model.value} - {conversation.scenario_id} (already evaluated)")
                 continue
 
@@ -297,65 +431,71 @@ TURNS 3 - Model Response:
                 continue
 
             try:
-                # Run multi-run evaluation (returns plain dict)
-                result = await self.evaluate_conversation_runs(scenario, conversation)
+                result = await self.evaluate_and_save(scenario, conversation)
                 evaluations.append(result)
 
-                # Save immediately
-                self.save_evaluation(result)
-
-                # Delay between evaluations to avoid rate limits
-                await asyncio.sleep(2.0)
-
+            except BudgetExceeded as e:
+                print(f"\n💸 Budget reached, stopping evaluation: {e}")
+                break
             except Exception as e:
                 print(f"  ✗ Failed: {e}")
                 import traceback
                 traceback.print_exc()
                 continue
 
+        if self.prompt_tokens:
+            share = self.prompt_cache_hit_tokens / self.prompt_tokens
+            print(f"Prompt cache: {self.prompt_cache_hit_tokens}/{self.prompt_tokens} judge input tokens served from cache ({share:.0%})")
+
         return evaluations
 
-    def save_evaluation(self, evaluation: Dict):
-        """Save a multi-run evaluation result (already a plain dict)"""
-        filename = Path("data/evaluations.json")
+    def seed_ledger(self, scenarios: List[Scenario], ledger: WorkLedger) -> int:
+        """Register every saved conversation as a unit, marking evaluated ones done"""
+        scenario_ids = {s.id for s in scenarios}
+        return ledger.seed(
+            [(model, scenario_id) for model, scenario_id in self.iter_conversations().keys()
+             if scenario_id in scenario_ids],
+            self.store.contains
+        )
 
-        # Load existing evaluations if file exists
-        evaluations = []
-        if filename.exists():
-            with open(filename, "r") as f:
-                evaluations = json.load(f)
+    async def evaluate_with_ledger(
+        self,
+        scenarios: List[Scenario],
+        ledger: WorkLedger,
+        shard: Optional[Tuple[int, int]] = None,
+        concurrency: int = 1
+    ) -> Dict[str, int]:
+        """Evaluate the saved conversations this worker claims from a shared work ledger"""
+        scenario_map = {s.id: s for s in scenarios}
+        loader = self.iter_conversations()
+        self.seed_ledger(scenarios, ledger)
+
+        async def evaluate_unit(model: str, scenario_id: str):
+            conversation = loader.get(model, scenario_id)
+            if conversation is None:
+                raise FileNotFoundError(f"no saved conversation for {model} - {scenario_id}")
+            result = await self.evaluate_and_save(scenario_map[scenario_id], conversation)
+            print(f"  ✓ {model} - {scenario_id}: {result['total_score']}/30 [{ledger.worker_id}]")
+
+        return await ledger.drain(evaluate_unit, concurrency, shard)
+
+    async def evaluate_and_save(self, scenario: Scenario, conversation: Conversation) -> Dict[str, Any]:
+        """Run the multi-run evaluation for one conversation and save it immediately"""
+        result = await self.evaluate_conversation_runs(scenario, conversation)
+        self.save_evaluation(result)
+        return result
 
-        # Add new evaluation
-        evaluations.append(evaluation)
+    def save_evaluation(self, evaluation: Dict):
+        """Save a multi-run evaluation result (already a plain dict) to the append-only store"""
+        self.store.append(evaluation)
 
-        # Save all evaluations
-        with open(filename, "w") as f:
-            json.dump(evaluations, f, indent=2)
+    def iter_conversations(self, base_path: Path = Path("data/responses")) -> ConversationLoader:
+        """Lazily load conversations from the file system (see ConversationLoader)"""
+        return ConversationLoader(base_path)
 
     def load_conversations(self, base_path: Path = Path("data/responses")) -> List[Conversation]:
         """Load all conversations from file system"""
-        conversations = []
-
-        if not isinstance(base_path, Path):
-            base_path = Path(base_path)
-
-        for model_dir in base_path.iterdir():
-            if not model_dir.is_dir():
-                continue
-
-            try:
-                model_name = ModelName(model_dir.name)
-            except ValueError:
-                continue
-
-            for file_path in model_dir.glob("*.json"):
-                with open(file_path, "r") as f:
-                    data = json.load(f)
-
-                conversation = Conversation(**data)
-                conversations.append(conversation)
-
-        return conversations
+        return list(self.iter_conversations(base_path))
 
 
 async def main():
@@ -370,14 +510,20 @@ async def main():
     print(f"Loaded {len(scenarios)} scenarios")
 
     # Load conversations
-    conversations = judge.load_conversations()
-    print(f"Loaded {len(conversations)} conversations")
+    conversations = judge.iter_conversations()
+    print(f"Found {len(conversations)} conversations")
 
-    print(f"\nRunning {NUM_EVAL_RUNS} evaluations per conversation for reproducibility")
+    if judge.adaptive:
+        print(f"\nAdaptive judging: {judge.min_runs}-{judge.max_runs} runs per conversation")
+    else:
+        print(f"\nRunning {judge.num_runs} evaluations per conversation for reproducibility")
     print("Using temperature=0 for deterministic outputs\n")
 
     # Run evaluations
-    evaluations = await judge.evaluate_all_conversations(conversations, scenarios)
+    async with judge.client.batch_context():
+        evaluations = await judge.evaluate_all_conversations(conversations, scenarios)
+
+    judge.store.export_json()
 
     print(f"\nEvaluation complete!")
     print(f"Total conversations evaluated: {len(evaluations)}")
@@ -2,22 +2,31 @@ import json
 import asyncio
 import sys
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 # Add project root to Python path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 sys.path.insert(0, str(project_root / "src"))
 
-from src.api_client import client
+# usage_context and BudgetExceeded from the same usage_ledger module the client uses
+from src.api_client import ModelClient, get_client, usage_context, BudgetExceeded
 from src.models import ModelName, Scenario, ScenarioCategory, Message
 
 
 class ScenarioGenerator:
     """Generates 5 unique scenarios per category using specific prompts"""
     
-    def __init__(self):
+    def __init__(self, client: Optional[ModelClient] = None):
         self.model = ModelName.QWEN_72B
+        self._client = client
+
+    @property
+    def client(self) -> ModelClient:
+        """The injected client, or the shared one built on first use"""
+        if self._client is None:
+            self._client = get_client()
+        return self._client
     
     async def generate_scenarios(self, count: int = 42) -> List[Scenario]:
         """Generate 5 unique scenarios per category using specific prompts"""
@@ -117,7 +126,8 @@ Just provide the JSON with these exact 2 fields, no other text or fields."""
                 
                 try:
                     print(f"Generating {total_scenario_id_str}/{count}...")
-                    response = await client.query(self.model, messages, max_tokens=1000)
+                    with usage_context(phase="generate", scenario=total_scenario_id_str):
+                        response = await self.client.query(self.model, messages, max_tokens=1000)
                     
                     try:
                         scenario_data = json.loads(response.content)
@@ -141,10 +151,11 @@ Just provide the JSON with these exact 2 fields, no other text or fields."""
                     except json.JSONDecodeError:
                         print(f"Failed to parse JSON for scenario {total_scenario_id_str}")
                     
+                except BudgetExceeded as e:
+                    print(f"💸 Budget reached, stopping generation: {e}")
+                    return scenarios
                 except Exception as e:
                     print(f"Error generating scenario {total_scenario_id_str}: {e}")
-                    
-                await asyncio.sleep(2.0)
         
         print(f"Successfully generated {len(scenarios)} scenarios")
         return scenarios
@@ -162,7 +173,8 @@ async def main():
     print("-" * 40)
     
     generator = ScenarioGenerator()
-    scenarios = await generator.generate_scenarios()
+    async with generator.client.batch_context():
+        scenarios = await generator.generate_scenarios()
     generator.save_scenarios(scenarios)
     
     print(f"\nGenerated {len(scenarios)} scenarios")
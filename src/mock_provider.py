@@ -0,0 +1,343 @@
+import sys
+import json
+import math
+import time
+import random
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Any, List, Callable, Optional
+import yaml
+
+CONFIG_PATH = Path(__file__).parent.parent / "config" / "models.yaml"
+
+SCORING_DIMENSIONS = [
+    "evokes_awareness",
+    "active_listening_indicators",
+    "maintains_client_agency",
+    "question_depth_progression",
+    "client_centered_communication",
+    "ethical_boundaries"
+]
+
+COACH_REPLIES = [
+    "It sounds like this has been weighing on you for a while. What feels most important to you about it right now?",
+    "You mentioned feeling stuck. When you imagine things being different, what do you notice first?",
+    "There seem to be a few threads here. Which one would be most useful for us to explore?"
+]
+
+USER_REPLIES = [
+    "I guess I hadn't thought about it that way. I still feel like the problem is mostly the situation, though.",
+    "Maybe. Part of me knows that, but when it actually happens I just fall back into the same thing.",
+    "I'm not sure. It's hard to say what I want when I'm this tired of it."
+]
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Latency sampler (milliseconds) from a spec string
+
+    constant:MS | uniform:LOW:HIGH | normal:MEAN:SD | lognormal:MEDIAN:SIGMA
+    """
+    kind, *params = spec.split(":")
+    values = [float(p) for p in params]
+
+    if kind == "constant":
+        return lambda rng: values[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal":
+        # Heavy right tail, like real completion latencies
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients hang up on purpose (cancelled hedged requests, timeouts)
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            return
+        super().handle_error(request, client_address)
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class MockProvider:
+    """Local OpenAI-compatible /chat/completions server for offline runs
+
+    Replies are routed on the prompt: judge prompts get canned evaluation
+    JSON (bare when response_format asks for a JSON object), scenario
+    prompts get scenario JSON, user-turn prompts get a user reply and
+    everything else gets a coaching reply. Latency, 5xx errors,
+    429s (with Retry-After) and malformed judge output are injected from
+    the `mock_provider` section of config/models.yaml, seeded for
+    reproducible runs. Streaming requests are answered with SSE chunks.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, port: Optional[int] = None):
+        config = config or {}
+        self.host = config.get("host", "127.0.0.1")
+        self.port = port if port is not None else config.get("port", 8700)
+        self.latency_spec = config.get("latency", "lognormal:800:0.5")
+        self.sample_latency = parse_latency(self.latency_spec)
+        self.error_rate = config.get("error_rate", 0.0)
+        self.rate_limit_rate = config.get("rate_limit_rate", 0.0)
+        self.retry_after = config.get("retry_after", 1)
+        self.malformed_judge_rate = config.get("malformed_judge_rate", 0.0)
+        self.stream_token_delay_ms = config.get("stream_token_delay_ms", 5.0)
+
+        self.rng = random.Random(config.get("seed", 0))
+        self._lock = threading.Lock()
+        self._seen_prefixes = set()
+        self.stats = {"requests": 0, "ok": 0, "errors": 0, "rate_limited": 0, "streamed": 0}
+
+        self._server: Optional[_Server] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    def _random(self) -> float:
+        with self._lock:
+            return self.rng.random()
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _reply(self, messages: List[Dict[str, str]], json_mode: bool = False) -> str:
+        text = "\n".join(m.get("content", "") for m in messages)
+        with self._lock:
+            rng = random.Random(self.rng.random())
+
+        if "## Conversation to Evaluate" in text:
+            if rng.random() < self.malformed_judge_rate:
+                return '```json\n{"scores": {"evokes_awareness": 4, "active_listening'
+            evaluation = {
+                "scores": {dim: rng.randint(2, 5) for dim in SCORING_DIMENSIONS},
+                "coaching_vs_advice_moments": {
+                    "stayed_in_inquiry": rng.randint(0, 4),
+                    "slipped_to_advice": rng.randint(0, 2),
+                    "slipped_to_therapy": 0,
+                    "slipped_to_consulting": rng.randint(0, 1)
+                },
+                "qualitative_assessment": "Mock evaluation: the coach mostly stayed curious.",
+                "strong_examples": ["What feels most important to you about it right now?"],
+                "weak_examples": ["You should try making a list."],
+                "contra_evidence": []
+            }
+            if json_mode:
+                return json.dumps(evaluation)
+            return "```json\n" + json.dumps(evaluation, indent=2) + "\n```"
+
+        if "Format your response as JSON" in text:
+            return json.dumps({
+                "category": "mock",
+                "prompt": "I keep saying I'll change jobs but every time an offer comes up I find a reason to stay."
+            })
+
+        if "user response" in text.lower():
+            return rng.choice(USER_REPLIES)
+
+        return rng.choice(COACH_REPLIES)
+
+    def _usage(self, messages: List[Dict[str, str]], content: str) -> Dict[str, int]:
+        prompt_tokens = sum(_estimate_tokens(m.get("content", "")) for m in messages)
+        completion_tokens = _estimate_tokens(content)
+
+        # Leading system message counts as a prompt-cache hit once it has been seen
+        cache_hit = 0
+        if messages and messages[0].get("role") == "system":
+            digest = hashlib.sha256(messages[0]["content"].encode("utf-8")).hexdigest()
+            with self._lock:
+                if digest in self._seen_prefixes:
+                    cache_hit = _estimate_tokens(messages[0]["content"])
+                self._seen_prefixes.add(digest)
+
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_cache_hit_tokens": cache_hit,
+            "prompt_cache_miss_tokens": prompt_tokens - cache_hit
+        }
+
+    def _make_handler(self):
+        provider = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_chunk(self, data: bytes):
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/stats"):
+                    with provider._lock:
+                        self._send_json(200, dict(provider.stats))
+                else:
+                    self._send_json(404, {"error": {"message": "not found"}})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+
+                if not self.path.endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "not found"}})
+                    return
+                provider._count("requests")
+
+                if provider._random() < provider.rate_limit_rate:
+                    provider._count("rate_limited")
+                    self._send_json(
+                        429,
+                        {"error": {"message": "Rate limit exceeded (mock)"}},
+                        {"Retry-After": str(provider.retry_after)}
+                    )
+                    return
+
+                with provider._lock:
+                    latency_ms = provider.sample_latency(provider.rng)
+
+                if provider._random() < provider.error_rate:
+                    time.sleep(latency_ms / 1000)
+                    provider._count("errors")
+                    self._send_json(500, {"error": {"message": "Internal error (mock)"}})
+                    return
+
+                messages = payload.get("messages", [])
+                json_mode = (payload.get("response_format") or {}).get("type") == "json_object"
+                content = provider._reply(messages, json_mode)
+                usage = provider._usage(messages, content)
+                model = payload.get("model", "mock")
+
+                if payload.get("stream"):
+                    self._stream(model, content, usage, latency_ms)
+                    return
+
+                time.sleep(latency_ms / 1000)
+                provider._count("ok")
+                self._send_json(200, {
+                    "id": f"mock-{provider.stats['requests']}",
+                    "object": "chat.completion",
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop"
+                    }],
+                    "usage": usage
+                })
+
+            def _stream(self, model: str, content: str, usage: Dict[str, int], latency_ms: float):
+                # Latency is time to first token; then one word per token delay
+                provider._count("streamed")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                time.sleep(latency_ms / 1000)
+
+                words = content.split(" ")
+                for i, word in enumerate(words):
+                    delta = word if i == 0 else " " + word
+                    event = {"model": model, "choices": [{"index": 0, "delta": {"content": delta}}]}
+                    self._send_chunk(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+                    time.sleep(provider.stream_token_delay_ms / 1000)
+
+                self._send_chunk(f"data: {json.dumps({'model': model, 'choices': [], 'usage': usage})}\n\n".encode("utf-8"))
+                self._send_chunk(b"data: [DONE]\n\n")
+                self._send_chunk(b"")
+                provider._count("ok")
+
+        return Handler
+
+    def start(self) -> "MockProvider":
+        """Serve on a background thread"""
+        self._server = _Server((self.host, self.port), self._make_handler())
+        self.port = self._server.server_address[1]  # port 0 picks a free port
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "MockProvider":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def load_mock_config(config_path: Path = CONFIG_PATH) -> Dict[str, Any]:
+    with open(config_path, "r") as f:
+        return yaml.safe_load(f).get("mock_provider", {})
+
+
+def main():
+    """Run the mock provider until interrupted"""
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible mock LLM provider")
+    parser.add_argument("--port", type=int, help="Port to listen on (config default: 8700)")
+    parser.add_argument("--latency", help="constant:MS | uniform:LOW:HIGH | normal:MEAN:SD | lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--error-rate", type=float, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--rate-limit-rate", type=float, help="Fraction of requests answered with HTTP 429")
+    parser.add_argument("--malformed-judge-rate", type=float, help="Fraction of judge replies with truncated JSON")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    config = load_mock_config()
+    overrides = {
+        "port": args.port,
+        "latency": args.latency,
+        "error_rate": args.error_rate,
+        "rate_limit_rate": args.rate_limit_rate,
+        "malformed_judge_rate": args.malformed_judge_rate,
+        "seed": args.seed
+    }
+    config.update({k: v for k, v in overrides.items() if v is not None})
+
+    provider = MockProvider(config)
+    provider.start()
+    print(f"Mock provider listening on {provider.base_url} (latency {provider.latency_spec})")
+    print("Point the pipeline at it with:")
+    print(f"  OPENROUTER_BASE_URL={provider.base_url} DEEPSEEK_BASE_URL={provider.base_url} \\")
+    print("  OPENROUTER_API_KEY=mock DEEPSEEK_API_KEY=mock python scripts/run_pipeline.py")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        provider.stop()
+        print(f"\nServed: {provider.stats}")
+
+
+if __name__ == "__main__":
+    main()
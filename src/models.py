@@ -35,6 +35,8 @@ class ModelResponse(BaseModel):
     usage: Dict[str, Any] = Field(default_factory=dict)
     timestamp: datetime = Field(default_factory=datetime.now)
     response_time_ms: Optional[float] = None
+    time_to_first_token_ms: Optional[float] = None
+    tokens_per_second: Optional[float] = None
 
 
 class Scenario(BaseModel):
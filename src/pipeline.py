@@ -0,0 +1,94 @@
+import asyncio
+from typing import List, Dict, Any, Optional
+
+from api_client import ModelClient
+from collector import ConversationCollector, load_config
+from evaluator import Judge
+from models import Conversation, Scenario
+from usage_ledger import BudgetExceeded
+
+
+class Pipeline:
+    """Runs collection and evaluation at once: each saved conversation is queued
+    for a pool of judge workers instead of waiting for the whole collection phase"""
+
+    def __init__(
+        self,
+        collector: Optional[ConversationCollector] = None,
+        judge: Optional[Judge] = None,
+        judge_workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        client: Optional[ModelClient] = None
+    ):
+        config = load_config().get("pipeline", {})
+        self.collector = collector or ConversationCollector(client)
+        self.judge = judge or Judge(client)
+        self.judge_workers = judge_workers or config.get("judge_workers", 4)
+        self.queue_size = queue_size or config.get("queue_size", 20)
+
+        self.evaluations: List[Dict[str, Any]] = []
+        self.failed = 0
+        self.budget_reached: Optional[BudgetExceeded] = None
+
+    async def run(self, scenarios: List[Scenario]) -> List[Dict[str, Any]]:
+        """Collect and evaluate every scenario x test model; returns new evaluations"""
+
+        scenario_map = {s.id: s for s in scenarios}
+
+        # Bounded queue: collection blocks once judges fall queue_size behind
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+
+        async def enqueue(conversation: Conversation):
+            if not self.judge.store.contains(conversation.model.value, conversation.scenario_id):
+                await queue.put(conversation)
+
+        async def enqueue_existing():
+            # Conversations collected earlier but never judged
+            async for conversation in self.judge.iter_conversations():
+                if conversation.scenario_id in scenario_map:
+                    await enqueue(conversation)
+
+        async def judge_worker(worker_id: int):
+            while True:
+                conversation = await queue.get()
+                try:
+                    if conversation is None:
+                        return
+                    await self._evaluate(scenario_map[conversation.scenario_id], conversation, worker_id)
+                finally:
+                    queue.task_done()
+
+        workers = [asyncio.create_task(judge_worker(i + 1)) for i in range(self.judge_workers)]
+        try:
+            await asyncio.gather(
+                enqueue_existing(),
+                self.collector.collect_all_conversations_concurrent(scenarios, on_conversation=enqueue)
+            )
+
+            # Drain: one sentinel per worker after all queued conversations
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+        return self.evaluations
+
+    async def _evaluate(self, scenario: Scenario, conversation: Conversation, worker_id: int):
+        label = f"{conversation.model.value} - {conversation.scenario_id}"
+        if self.budget_reached:
+            return  # drain the queue without calling the judge
+        try:
+            result = await self.judge.evaluate_and_save(scenario, conversation)
+        except BudgetExceeded as e:
+            self.budget_reached = e
+            print(f"  [judge {worker_id}] 💸 Budget reached, skipping remaining evaluations: {e}")
+            return
+        except Exception as e:
+            self.failed += 1
+            print(f"  [judge {worker_id}] ✗ {label} failed: {e}")
+            return
+
+        self.evaluations.append(result)
+        print(f"  [judge {worker_id}] ✓ {label}: {result['total_score']}/30")
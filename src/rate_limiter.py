@@ -0,0 +1,172 @@
+import re
+import time
+import asyncio
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, List, Optional, Mapping
+
+
+class TokenBucket:
+    """Continuously refilling budget of `per_minute` units, bursting up to `capacity`"""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or max(1.0, per_minute / 10)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0):
+        """Wait until `amount` units are available and take them"""
+        # A single request larger than the burst size still has to go through eventually
+        amount = min(amount, self.capacity)
+
+        async with self._lock:
+            self._refill()
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= amount
+
+    def adjust(self, delta: float):
+        """Charge (positive) or refund (negative) units after the real cost is known"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+
+class RateLimiter:
+    """Per-provider and per-model request/token budgets shared by all callers
+
+    Budgets come from the `rate_limits` section of config/models.yaml. Scopes
+    are paused when a provider answers 429 (honouring `Retry-After`) or reports
+    an exhausted quota through `x-ratelimit-*` headers.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = config or {}
+        self._buckets: Dict[str, Dict[str, TokenBucket]] = {}
+        self._paused_until: Dict[str, float] = {}
+
+    def _scope_buckets(self, scope: str, limits: Dict[str, Any]) -> Dict[str, TokenBucket]:
+        if scope not in self._buckets:
+            buckets = {}
+            if limits.get("requests_per_minute"):
+                buckets["requests"] = TokenBucket(
+                    limits["requests_per_minute"], limits.get("request_burst")
+                )
+            if limits.get("tokens_per_minute"):
+                buckets["tokens"] = TokenBucket(
+                    limits["tokens_per_minute"], limits.get("token_burst")
+                )
+            self._buckets[scope] = buckets
+        return self._buckets[scope]
+
+    def _scopes(self, provider: str, model_key: str) -> List[str]:
+        return [f"provider:{provider}", f"model:{model_key}"]
+
+    def _buckets_for(self, provider: str, model_key: str) -> List[Dict[str, TokenBucket]]:
+        return [
+            self._scope_buckets(
+                f"provider:{provider}", self.config.get("providers", {}).get(provider, {})
+            ),
+            self._scope_buckets(
+                f"model:{model_key}", self.config.get("models", {}).get(model_key, {})
+            ),
+        ]
+
+    async def acquire(self, provider: str, model_key: str, estimated_tokens: int = 0):
+        """Wait for both the provider and model budgets to admit one request"""
+        for scope in self._scopes(provider, model_key):
+            while (delay := self._paused_until.get(scope, 0.0) - time.monotonic()) > 0:
+                await asyncio.sleep(delay)
+
+        for buckets in self._buckets_for(provider, model_key):
+            if "requests" in buckets:
+                await buckets["requests"].acquire(1)
+            if "tokens" in buckets and estimated_tokens:
+                await buckets["tokens"].acquire(estimated_tokens)
+
+    def record_usage(self, provider: str, model_key: str, estimated_tokens: int, actual_tokens: int):
+        """Reconcile the token estimate taken in acquire() with the reported usage"""
+        if not actual_tokens:
+            return
+        for buckets in self._buckets_for(provider, model_key):
+            if "tokens" in buckets:
+                buckets["tokens"].adjust(actual_tokens - estimated_tokens)
+
+    def pause(self, provider: str, model_key: str, seconds: float):
+        """Hold back new requests for a model for `seconds`"""
+        scope = f"model:{model_key}"
+        until = time.monotonic() + seconds
+        self._paused_until[scope] = max(self._paused_until.get(scope, 0.0), until)
+
+    def observe_response(self, provider: str, model_key: str, status_code: int,
+                         headers: Mapping[str, str]) -> Optional[float]:
+        """Apply Retry-After and rate-limit headers; returns the pause applied, if any"""
+        delay = None
+
+        if status_code in (429, 503):
+            delay = parse_retry_after(headers.get("retry-after"))
+            if delay is None:
+                delay = self.config.get("default_backoff", 5.0)
+        else:
+            for kind in ("requests", "tokens"):
+                remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+                if remaining is not None and _to_float(remaining) == 0:
+                    delay = max(delay or 0.0, parse_reset(headers.get(f"x-ratelimit-reset-{kind}")) or 0.0)
+            remaining = headers.get("x-ratelimit-remaining")
+            if remaining is not None and _to_float(remaining) == 0:
+                delay = max(delay or 0.0, parse_reset(headers.get("x-ratelimit-reset")) or 0.0)
+
+        if delay:
+            self.pause(provider, model_key, delay)
+        return delay
+
+
+def _to_float(value: str) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP-date) into seconds"""
+    if not value:
+        return None
+    seconds = _to_float(value)
+    if seconds is not None:
+        return max(0.0, seconds)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+def parse_reset(value: Optional[str]) -> Optional[float]:
+    """Parse an x-ratelimit-reset header into seconds from now
+
+    Accepts durations ("6m0s", "20ms"), plain seconds, and epoch timestamps in
+    seconds or milliseconds (OpenRouter reports the latter).
+    """
+    if not value:
+        return None
+    number = _to_float(value)
+    if number is None:
+        parts = _DURATION_PART.findall(value)
+        if not parts:
+            return None
+        return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+    if number > 1e12:
+        return max(0.0, number / 1000 - time.time())
+    if number > 1e9:
+        return max(0.0, number - time.time())
+    return number
@@ -0,0 +1,370 @@
+import os
+import re
+import json
+import time
+import argparse
+from pathlib import Path
+from datetime import datetime
+from collections import defaultdict, deque
+from typing import Dict, Any, List, Optional, Tuple, Iterable
+import yaml
+
+try:
+    from usage_ledger import current_tags
+except ImportError:
+    from src.usage_ledger import current_tags
+
+CONFIG_PATH = Path(__file__).parent.parent / "config" / "models.yaml"
+
+# Upper bounds (ms) of the Prometheus histogram buckets; completions run from
+# sub-second replies to minute-long judge calls
+BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 20000, 30000, 60000, 120000)
+STAGES = ("queue", "latency", "ttft", "total")
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class RequestSpan:
+    """Timings and outcome of one model call, from queueing to the last byte
+
+    queue = waiting for the model's concurrency slot plus the rate limiter,
+    latency = the HTTP exchange of the last attempt, ttft = time to the first
+    streamed token, total = everything including retries and backoff.
+    """
+
+    def __init__(self, trace_id: str, provider: str, model_key: str, stream: bool):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.provider = provider
+        self.model_key = model_key
+        self.stream = stream
+        self.tags = current_tags()
+        self.started_at = datetime.now().isoformat()
+        self._start = time.monotonic()
+
+        self.concurrency_wait_ms = 0.0
+        self.rate_limit_wait_ms = 0.0
+        self.attempts = 0
+        self.status: Optional[int] = None
+        self.error: Optional[str] = None
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.latency_ms: Optional[float] = None
+        self.ttft_ms: Optional[float] = None
+        self.total_ms: Optional[float] = None
+        self.hedged = False
+
+    def begin_attempt(self):
+        self.attempts += 1
+
+    def mark_hedged(self):
+        self.hedged = True
+
+    def add_rate_limit_wait(self, started: float):
+        self.rate_limit_wait_ms += (time.monotonic() - started) * 1000
+
+    def record_response(self, response: Any, latency_ms: float, ttft_ms: Optional[float] = None):
+        """Status, sizes and timings of the latest attempt's httpx response"""
+        self.status = response.status_code
+        self.request_bytes = int(response.request.headers.get("content-length", 0))
+        self.response_bytes = response.num_bytes_downloaded
+        self.latency_ms = latency_ms
+        self.ttft_ms = ttft_ms
+
+    def finish(self):
+        self.total_ms = (time.monotonic() - self._start) * 1000
+
+    def to_event(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "started_at": self.started_at,
+            "phase": self.tags.get("phase"),
+            "model": self.tags.get("model"),
+            "scenario_id": self.tags.get("scenario"),
+            "turn": self.tags.get("turn"),
+            "provider": self.provider,
+            "endpoint_model": self.model_key,
+            "stream": self.stream,
+            "attempts": self.attempts,
+            "hedged": self.hedged,
+            "status": self.status,
+            "error": self.error,
+            "request_bytes": self.request_bytes,
+            "response_bytes": self.response_bytes,
+            "queue_ms": self.concurrency_wait_ms + self.rate_limit_wait_ms,
+            "concurrency_wait_ms": self.concurrency_wait_ms,
+            "rate_limit_wait_ms": self.rate_limit_wait_ms,
+            "latency_ms": self.latency_ms,
+            "ttft_ms": self.ttft_ms,
+            "total_ms": self.total_ms
+        }
+
+
+class LatencyHistogram:
+    """Cumulative bucket counts for Prometheus plus recent samples for exact quantiles"""
+
+    def __init__(self, max_samples: int = 10000):
+        self.counts = [0] * len(BUCKETS_MS)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.samples: deque = deque(maxlen=max_samples)
+        self._sorted: Optional[List[float]] = None
+
+    def observe(self, value_ms: float):
+        self.count += 1
+        self.sum_ms += value_ms
+        self.samples.append(value_ms)
+        self._sorted = None
+        for i, bound in enumerate(BUCKETS_MS):
+            if value_ms <= bound:
+                self.counts[i] += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        if self._sorted is None:
+            # Cached until the next observation; the client asks for quantiles on every request
+            self._sorted = sorted(self.samples)
+        ordered = self._sorted
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class RequestMetrics:
+    """Per-request events from ModelClient, aggregated into latency histograms
+
+    Every finished request is appended to a JSONL trace (one span per call,
+    carrying the phase/model/scenario/turn tags from usage_context) and
+    observed into per-provider, per-model histograms for each stage. The
+    histograms can be written as a Prometheus text file; the trace can be
+    re-aggregated later by any tag with `python src/request_metrics.py`.
+    """
+
+    def __init__(
+        self,
+        config: Optional[Dict[str, Any]] = None,
+        trace_id: Optional[str] = None,
+        group_by: Tuple[str, ...] = ("provider", "endpoint_model")
+    ):
+        config = config or {}
+        metrics_config = config.get("metrics", {})
+        self.enabled = metrics_config.get("enabled", True)
+        self.trace_path = Path(metrics_config.get("trace_path", "data/traces/requests.jsonl"))
+        self.prometheus_path = Path(metrics_config.get("prometheus_path", "results/metrics.prom"))
+        self.trace_id = trace_id or datetime.now().strftime("%Y%m%dT%H%M%S")
+        self.group_by = group_by
+        # Set by work ledger workers: adds a worker label and writes metrics.<worker>.prom
+        self.worker: Optional[str] = None
+
+        self.histograms: Dict[Tuple, LatencyHistogram] = defaultdict(LatencyHistogram)
+        self.requests: Dict[Tuple, int] = defaultdict(int)
+        self.attempts: Dict[Tuple, int] = defaultdict(int)
+        self.bytes: Dict[Tuple, int] = defaultdict(int)
+
+    def start_span(self, provider: str, model_key: str, stream: bool = False) -> RequestSpan:
+        return RequestSpan(self.trace_id, provider, model_key, stream)
+
+    def finish(self, span: RequestSpan):
+        """Close a span, record it in the histograms and append it to the trace"""
+        span.finish()
+        event = span.to_event()
+        # Always aggregated: adaptive timeouts and hedging read the percentiles
+        self.observe(event)
+        if not self.enabled:
+            return
+
+        self.trace_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.trace_path, "a") as f:
+            f.write(json.dumps(event) + "\n")
+
+    def observe(self, event: Dict[str, Any]):
+        """Add one trace event to the aggregates"""
+        labels = tuple(str(event.get(key)) for key in self.group_by)
+        for stage in STAGES:
+            value = event.get(f"{stage}_ms")
+            if value is not None:
+                self.histograms[labels + (stage,)].observe(value)
+
+        status = str(event["status"]) if event.get("status") is not None else (event.get("error") or "error")
+        self.requests[labels + (status,)] += 1
+        self.attempts[labels] += event.get("attempts", 0)
+        self.bytes[labels + ("request",)] += event.get("request_bytes", 0)
+        self.bytes[labels + ("response",)] += event.get("response_bytes", 0)
+
+    def percentiles(self, *labels: str) -> Dict[str, Dict[str, Optional[float]]]:
+        """p50/p95/p99 per stage for one label combination (e.g. provider, model key)"""
+        result = {}
+        for stage in STAGES:
+            histogram = self.histograms.get(tuple(labels) + (stage,))
+            if histogram is not None and histogram.count:
+                result[stage] = {f"p{int(q * 100)}": histogram.quantile(q) for q in QUANTILES}
+        return result
+
+    def quantile(self, labels: Tuple[str, ...], stage: str, q: float, min_samples: int = 1) -> Optional[float]:
+        """One stage quantile (ms), or None until `min_samples` requests have been observed"""
+        histogram = self.histograms.get(tuple(labels) + (stage,))
+        if histogram is None or histogram.count < min_samples:
+            return None
+        return histogram.quantile(q)
+
+    def summary(self) -> Dict[str, Any]:
+        """Request counts, attempts and stage percentiles per label combination"""
+        groups = sorted({key[:-1] for key in self.histograms})
+        summary = {}
+        for labels in groups:
+            requests = sum(n for key, n in self.requests.items() if key[:-1] == labels)
+            summary["/".join(labels)] = {
+                "requests": requests,
+                "attempts": self.attempts.get(labels, 0),
+                "statuses": {key[-1]: n for key, n in self.requests.items() if key[:-1] == labels},
+                "stages": self.percentiles(*labels)
+            }
+        return summary
+
+    def print_summary(self):
+        summary = self.summary()
+        if not summary:
+            return
+        print(f"\n⏱️  Request latency (ms, p50/p95/p99) by {' / '.join(self.group_by)}")
+        print(f"  {'':<36}{'calls':>6}{'tries':>6}  {'queue':>18}  {'latency':>18}  {'ttft':>18}  {'total':>18}")
+
+        def cell(stages: Dict[str, Dict[str, float]], stage: str) -> str:
+            if stage not in stages:
+                return f"{'-':>18}"
+            p = stages[stage]
+            return f"{p['p50']:>6.0f}{p['p95']:>6.0f}{p['p99']:>6.0f}"
+
+        for name, group in summary.items():
+            stages = group["stages"]
+            print(f"  {name:<36}{group['requests']:>6}{group['attempts']:>6}  "
+                  f"{cell(stages, 'queue')}  {cell(stages, 'latency')}  {cell(stages, 'ttft')}  {cell(stages, 'total')}")
+
+    def prometheus_text(self) -> str:
+        """Histograms and counters in the Prometheus text exposition format"""
+
+        def label_str(labels: Iterable[Tuple[str, str]]) -> str:
+            if self.worker:
+                labels = [("worker", self.worker)] + list(labels)
+            return "{" + ",".join(f'{k}="{_escape_label(v)}"' for k, v in labels) + "}"
+
+        lines = [
+            "# HELP coachbench_request_duration_seconds Model request time per stage "
+            "(queue, latency, ttft, total)",
+            "# TYPE coachbench_request_duration_seconds histogram"
+        ]
+        for key in sorted(self.histograms):
+            histogram = self.histograms[key]
+            labels = list(zip(self.group_by, key[:-1])) + [("stage", key[-1])]
+            for bound, count in zip(BUCKETS_MS, histogram.counts):
+                lines.append(f"coachbench_request_duration_seconds_bucket"
+                             f"{label_str(labels + [('le', f'{bound / 1000:g}')])} {count}")
+            lines.append(f"coachbench_request_duration_seconds_bucket"
+                         f"{label_str(labels + [('le', '+Inf')])} {histogram.count}")
+            lines.append(f"coachbench_request_duration_seconds_sum{label_str(labels)} {histogram.sum_ms / 1000:.6f}")
+            lines.append(f"coachbench_request_duration_seconds_count{label_str(labels)} {histogram.count}")
+
+        lines += [
+            "# HELP coachbench_request_duration_quantile_seconds Exact quantiles over recent requests",
+            "# TYPE coachbench_request_duration_quantile_seconds gauge"
+        ]
+        for key in sorted(self.histograms):
+            labels = list(zip(self.group_by, key[:-1])) + [("stage", key[-1])]
+            for q in QUANTILES:
+                value = self.histograms[key].quantile(q)
+                lines.append(f"coachbench_request_duration_quantile_seconds"
+                             f"{label_str(labels + [('quantile', f'{q:g}')])} {value / 1000:.6f}")
+
+        lines += ["# HELP coachbench_requests_total Finished requests by final status",
+                  "# TYPE coachbench_requests_total counter"]
+        for key in sorted(self.requests):
+            labels = list(zip(self.group_by, key[:-1])) + [("status", key[-1])]
+            lines.append(f"coachbench_requests_total{label_str(labels)} {self.requests[key]}")
+
+        lines += ["# HELP coachbench_request_attempts_total HTTP attempts including retries",
+                  "# TYPE coachbench_request_attempts_total counter"]
+        for key in sorted(self.attempts):
+            lines.append(f"coachbench_request_attempts_total{label_str(zip(self.group_by, key))} {self.attempts[key]}")
+
+        lines += ["# HELP coachbench_request_bytes_total Bytes sent and received",
+                  "# TYPE coachbench_request_bytes_total counter"]
+        for key in sorted(self.bytes):
+            labels = list(zip(self.group_by, key[:-1])) + [("direction", key[-1])]
+            lines.append(f"coachbench_request_bytes_total{label_str(labels)} {self.bytes[key]}")
+
+        return "\n".join(lines) + "\n"
+
+    def default_prometheus_path(self) -> Path:
+        """prometheus_path, or one file per worker so concurrent workers do not overwrite each other"""
+        if not self.worker:
+            return self.prometheus_path
+        worker = re.sub(r"[^A-Za-z0-9_.-]", "-", self.worker)
+        return self.prometheus_path.with_name(f"{self.prometheus_path.stem}.{worker}{self.prometheus_path.suffix}")
+
+    def write_prometheus(self, path: Optional[Path] = None) -> Optional[Path]:
+        """Write the Prometheus text file (atomically, for node_exporter's textfile collector)"""
+        if not self.enabled or not self.histograms:
+            return None
+        path = Path(path or self.default_prometheus_path())
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text(self.prometheus_text())
+        os.replace(tmp_path, path)
+        return path
+
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def load_events(path: Path) -> List[Dict[str, Any]]:
+    if not path.exists():
+        return []
+    events = []
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue  # truncated last line
+    return events
+
+
+def main():
+    """Aggregate the request trace by any combination of tags"""
+    parser = argparse.ArgumentParser(description="Latency percentiles from the request trace")
+    parser.add_argument("--run", help="Only trace ids starting with this ('latest' for the most recent run)")
+    parser.add_argument("--by", default="provider,endpoint_model",
+                        help="Comma-separated grouping, e.g. phase,endpoint_model or model,turn")
+    parser.add_argument("--phase", help="Only requests from this phase (generate, collect, user-turn, judge)")
+    parser.add_argument("--prometheus", help="Also write the aggregates as a Prometheus text file here")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    args = parser.parse_args()
+
+    with open(CONFIG_PATH, "r") as f:
+        config = yaml.safe_load(f)
+
+    metrics = RequestMetrics(config, group_by=tuple(args.by.split(",")))
+    events = load_events(metrics.trace_path)
+    if args.run:
+        trace_id = events[-1]["trace_id"] if args.run == "latest" and events else args.run
+        events = [e for e in events if e["trace_id"].startswith(trace_id)]
+    if args.phase:
+        events = [e for e in events if e.get("phase") == args.phase]
+    if not events:
+        print(f"No requests traced in {metrics.trace_path}")
+        return
+
+    for event in events:
+        metrics.observe(event)
+
+    if args.json:
+        print(json.dumps(metrics.summary(), indent=2))
+    else:
+        print(f"=== {len(events)} traced requests ===")
+        metrics.print_summary()
+
+    if args.prometheus:
+        print(f"\n📁 Prometheus metrics written to {metrics.write_prometheus(Path(args.prometheus))}")
+
+
+if __name__ == "__main__":
+    main()
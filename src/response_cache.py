@@ -0,0 +1,121 @@
+import json
+import time
+import hashlib
+import sqlite3
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+
+class ResponseCache:
+    """Content-addressed on-disk cache of chat completion results (SQLite)
+
+    Entries are keyed on a hash of endpoint, messages, temperature and
+    max_tokens, so re-running a phase only pays for requests whose inputs
+    changed. Old entries are evicted by age, then least-recently-used beyond
+    `max_entries`.
+    """
+
+    EVICT_EVERY = 500  # puts between eviction passes
+
+    def __init__(
+        self,
+        path: str = "data/cache/responses.sqlite",
+        max_age_days: Optional[float] = 30,
+        max_entries: Optional[int] = 50000
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_age_days = max_age_days
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used_at)"
+        )
+        self._conn.commit()
+        self.evict()
+
+    @staticmethod
+    def make_key(
+        endpoint: str,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        variant: Optional[str] = None
+    ) -> str:
+        """Hash the request inputs; `variant` separates intentionally repeated samples"""
+        payload = json.dumps(
+            [endpoint, messages, temperature, max_tokens, variant],
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result for a key, or None"""
+        row = self._conn.execute(
+            "SELECT data FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._conn.execute(
+            "UPDATE responses SET last_used_at = ? WHERE key = ?", (time.time(), key)
+        )
+        self._conn.commit()
+        return json.loads(row[0])
+
+    def put(self, key: str, data: Dict[str, Any]):
+        """Store a result for a key"""
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO responses (key, data, created_at, last_used_at) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(data, default=str), now, now)
+        )
+        self._conn.commit()
+
+        self._puts += 1
+        if self._puts % self.EVICT_EVERY == 0:
+            self.evict()
+
+    def delete(self, key: str):
+        """Drop one entry (e.g. a cached reply that turned out to be unusable)"""
+        self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+        self._conn.commit()
+
+    def evict(self):
+        """Drop entries older than max_age_days, then the least recently used over max_entries"""
+        if self.max_age_days:
+            cutoff = time.time() - self.max_age_days * 86400
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (cutoff,))
+        if self.max_entries:
+            self._conn.execute(
+                """DELETE FROM responses WHERE key IN (
+                    SELECT key FROM responses ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+                )""",
+                (self.max_entries,)
+            )
+        self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters for this process and the number of stored entries"""
+        entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,196 @@
+import json
+import time
+import random
+import asyncio
+from typing import Dict, Any, Optional, Callable, Awaitable, TypeVar
+
+from src.rate_limiter import parse_retry_after
+
+T = TypeVar("T")
+
+# Transient statuses: timeouts, conflicts, rate limits and gateway/server errors.
+# Anything else (400 bad request, 401/403 auth, 404, 422) will not succeed on retry.
+DEFAULT_RETRY_STATUSES = (408, 409, 425, 429, 500, 502, 503, 504)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a provider whose circuit breaker is open"""
+
+
+class StreamInterruptedError(RuntimeError):
+    """A stream failed after chunks were handed to the caller; retrying would repeat them"""
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    response = getattr(exc, "response", None)
+    return getattr(response, "status_code", None)
+
+
+class RetryPolicy:
+    """Which failures to retry and how long to wait before the next attempt
+
+    HTTP errors are retried only for transient statuses; timeouts, connection
+    errors and unparseable bodies are always retried. Waits use exponential
+    backoff with full jitter, but never less than the provider's Retry-After.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.max_attempts = config.get("max_attempts", 4)
+        self.backoff_base = config.get("backoff_base", 1.0)
+        self.backoff_max = config.get("backoff_max", 30.0)
+        self.retry_statuses = set(config.get("retry_statuses", DEFAULT_RETRY_STATUSES))
+        self.rng = random.Random()
+
+    def is_retryable(self, exc: BaseException) -> bool:
+        import httpx
+
+        if isinstance(exc, httpx.HTTPStatusError):
+            return exc.response.status_code in self.retry_statuses
+        return isinstance(exc, (httpx.TransportError, json.JSONDecodeError))
+
+    def is_provider_failure(self, exc: BaseException) -> bool:
+        """Failures that say the endpoint is unhealthy (counted by the circuit breaker)
+
+        429s are excluded: the rate limiter already pauses on them, and a
+        throttled provider is healthy.
+        """
+        if isinstance(exc, StreamInterruptedError) and exc.__cause__ is not None:
+            exc = exc.__cause__
+        return self.is_retryable(exc) and _status_code(exc) != 429
+
+    def delay(self, attempt: int, exc: BaseException) -> float:
+        """Seconds to wait after failed attempt number `attempt` (1-based)"""
+        backoff = self.rng.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+        response = getattr(exc, "response", None)
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get("retry-after"))
+            if retry_after is not None:
+                return max(backoff, min(retry_after, self.backoff_max * 4))
+        return backoff
+
+
+class CircuitBreaker:
+    """Stops calling a provider after repeated failures, then probes it again
+
+    closed: requests flow; `failure_threshold` consecutive provider failures
+    open the circuit. open: requests fail fast with CircuitOpenError for
+    `cooldown` seconds. half-open: one probe request is let through; success
+    closes the circuit, failure opens it for another cooldown.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, cooldown: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.cooldown:
+            return "open"
+        return "half-open"
+
+    def before_request(self):
+        """Raise CircuitOpenError unless a request may be sent now"""
+        state = self.state
+        if state == "open":
+            remaining = self.cooldown - (time.monotonic() - self.opened_at)
+            raise CircuitOpenError(
+                f"{self.name} circuit open after {self.failures} consecutive failures, "
+                f"retrying in {remaining:.0f}s"
+            )
+        if state == "half-open":
+            if self.probing:
+                raise CircuitOpenError(f"{self.name} circuit half-open, waiting for the probe request")
+            self.probing = True
+
+    def record_success(self):
+        if self.opened_at is not None:
+            print(f"  🔌 {self.name} circuit closed")
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.probing = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                print(f"  🔌 {self.name} circuit opened after {self.failures} consecutive failures")
+            self.opened_at = time.monotonic()
+
+    def release_probe(self):
+        """Give up a probe slot without a verdict (e.g. a non-provider error)"""
+        self.probing = False
+
+
+async def with_retries(
+    send: Callable[[int], Awaitable[T]],
+    policy: RetryPolicy,
+    breaker: Optional[CircuitBreaker] = None,
+    label: str = ""
+) -> T:
+    """Call send(attempt) until it succeeds, retrying transient failures per the policy"""
+    attempt = 0
+    while True:
+        attempt += 1
+        if breaker is not None:
+            breaker.before_request()
+        try:
+            result = await send(attempt)
+        except Exception as e:
+            if breaker is not None:
+                if policy.is_provider_failure(e):
+                    breaker.record_failure()
+                else:
+                    breaker.release_probe()
+            if attempt >= policy.max_attempts or not policy.is_retryable(e):
+                raise
+            delay = policy.delay(attempt, e)
+            status = _status_code(e)
+            reason = f"HTTP {status}" if status else type(e).__name__
+            print(f"  ↻ {label} attempt {attempt} failed ({reason}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            continue
+
+        if breaker is not None:
+            breaker.record_success()
+        return result
+
+
+async def hedged(
+    send: Callable[[], Awaitable[T]],
+    hedge_after: Optional[float],
+    on_hedge: Optional[Callable[[], None]] = None
+) -> T:
+    """Run send(); if it has not finished after `hedge_after` seconds, race a duplicate
+
+    The first call to succeed wins and the other is cancelled. If both fail,
+    the primary's error is raised.
+    """
+    if hedge_after is None:
+        return await send()
+
+    primary = asyncio.ensure_future(send())
+    pending = {primary}
+    try:
+        done, _ = await asyncio.wait(pending, timeout=hedge_after)
+        if not done:
+            if on_hedge is not None:
+                on_hedge()
+            pending.add(asyncio.ensure_future(send()))
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+        raise primary.exception()
+    finally:
+        for task in pending:
+            task.cancel()
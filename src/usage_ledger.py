@@ -0,0 +1,269 @@
+import os
+import json
+import argparse
+import contextvars
+from pathlib import Path
+from datetime import datetime
+from contextlib import contextmanager
+from collections import defaultdict
+from typing import Dict, Any, List, Optional, Iterator
+import yaml
+
+CONFIG_PATH = Path(__file__).parent.parent / "config" / "models.yaml"
+PHASES = ("generate", "collect", "user-turn", "judge")
+
+# Tags (phase, model, scenario, turn) for the API calls made in the current task
+_tags: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar("usage_tags", default={})
+
+
+@contextmanager
+def usage_context(**tags):
+    """Tag every API call made inside the block, e.g. usage_context(phase="judge", model=..., scenario=...)
+
+    Tags nest (inner values win) and follow asyncio tasks created inside the block.
+    """
+    token = _tags.set({**_tags.get(), **{k: v for k, v in tags.items() if v is not None}})
+    try:
+        yield
+    finally:
+        _tags.reset(token)
+
+
+def current_tags() -> Dict[str, Any]:
+    return dict(_tags.get())
+
+
+class BudgetExceeded(RuntimeError):
+    """A usage budget ceiling from config/models.yaml was reached; no further calls are made"""
+
+
+class UsageLedger:
+    """Append-only JSONL record of every model call's tokens, latency and cost
+
+    Each line carries the phase/model/scenario tags active when the call was
+    made (see usage_context), the queried model's config key, token counts
+    (prompt, completion, provider-cached prompt), latency and the cost from
+    the `pricing` table. Calls served from the response cache are recorded
+    with cost 0. Budgets from the `usage.budgets` section apply to the spend
+    of the current run and are checked before every call.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        usage_config = config.get("usage", {})
+        self.enabled = usage_config.get("enabled", True)
+        self.path = Path(usage_config.get("ledger_path", "data/usage.jsonl"))
+        self.pricing: Dict[str, Dict[str, float]] = config.get("pricing", {}) or {}
+        self.budgets: Dict[str, Any] = usage_config.get("budgets", {}) or {}
+
+        # The pid keeps processes started in the same second (e.g. --workers) apart
+        self.run_id = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+        self.run_cost = 0.0
+        self.run_tokens = 0
+        self.phase_cost: Dict[str, float] = defaultdict(float)
+        self.unpriced = set()
+
+        # A USD ceiling cannot be enforced on calls whose cost is unknown
+        if self.enabled and (self.budgets.get("max_cost_usd") is not None or self.budgets.get("phases")):
+            missing = sorted(set(config.get("models", {})) - set(self.pricing))
+            if missing:
+                raise ValueError(
+                    f"USD budget set but no pricing entry for: {', '.join(missing)} "
+                    "(add them to 'pricing' in config/models.yaml)"
+                )
+
+    def cost(self, model_key: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int) -> Optional[float]:
+        """USD cost of a call, or None if the model has no pricing entry"""
+        prices = self.pricing.get(model_key)
+        if not prices:
+            return None
+        input_price = prices.get("input_per_million", 0.0)
+        cached_price = prices.get("cached_input_per_million", input_price)
+        output_price = prices.get("output_per_million", 0.0)
+        return (
+            (prompt_tokens - cached_tokens) * input_price
+            + cached_tokens * cached_price
+            + completion_tokens * output_price
+        ) / 1_000_000
+
+    def check_budget(self):
+        """Raise BudgetExceeded if the current run has reached a ceiling"""
+        max_cost = self.budgets.get("max_cost_usd")
+        if max_cost is not None and self.run_cost >= max_cost:
+            raise BudgetExceeded(f"run cost ${self.run_cost:.2f} reached the ${max_cost:.2f} budget")
+
+        max_tokens = self.budgets.get("max_tokens")
+        if max_tokens is not None and self.run_tokens >= max_tokens:
+            raise BudgetExceeded(f"run used {self.run_tokens} tokens, budget is {max_tokens}")
+
+        phase = _tags.get().get("phase")
+        phase_budget = (self.budgets.get("phases") or {}).get(phase)
+        if phase_budget is not None and self.phase_cost[phase] >= phase_budget:
+            raise BudgetExceeded(
+                f"{phase} phase cost ${self.phase_cost[phase]:.2f} reached its ${phase_budget:.2f} budget"
+            )
+
+    def run_summary(self) -> str:
+        """One-line spend of the current run for the end of a script"""
+        cost = f"${self.run_cost:.4f}"
+        if self.unpriced:
+            cost += f" (excluding unpriced {', '.join(sorted(self.unpriced))})"
+        return f"Run {self.run_id}: {self.run_tokens} tokens, {cost}"
+
+    def record(self, model_key: str, usage: Dict[str, Any], latency_ms: Optional[float], cache_hit: bool = False):
+        """Append one call to the ledger and update the run totals"""
+        if not self.enabled:
+            return
+
+        prompt_tokens = usage.get("prompt_tokens", 0) or 0
+        completion_tokens = usage.get("completion_tokens", 0) or 0
+        cached_tokens = usage.get("prompt_cache_hit_tokens")
+        if cached_tokens is None:
+            cached_tokens = (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0) or 0
+
+        cost = 0.0 if cache_hit else self.cost(model_key, prompt_tokens, completion_tokens, cached_tokens)
+        if cost is None:
+            self.unpriced.add(model_key)
+
+        tags = _tags.get()
+        entry = {
+            "run_id": self.run_id,
+            "timestamp": datetime.now().isoformat(),
+            "phase": tags.get("phase"),
+            "model": tags.get("model"),
+            "scenario_id": tags.get("scenario"),
+            "turn": tags.get("turn"),
+            "endpoint_model": model_key,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cached_tokens": cached_tokens,
+            "latency_ms": latency_ms,
+            "cost_usd": cost,
+            "response_cache_hit": cache_hit
+        }
+
+        if not cache_hit:
+            self.run_cost += cost or 0.0
+            self.run_tokens += prompt_tokens + completion_tokens
+            self.phase_cost[entry["phase"]] += cost or 0.0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+
+def load_entries(path: Path) -> Iterator[Dict[str, Any]]:
+    if not path.exists():
+        return
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue  # truncated last line
+
+
+def summarize(entries: List[Dict[str, Any]], evaluations: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Per-phase, per-endpoint and per-test-model totals, plus cost per point of judge score"""
+
+    def bucket():
+        return {"calls": 0, "cache_hits": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                "cached_tokens": 0, "cost_usd": 0.0, "latency_ms": 0.0, "unpriced_calls": 0}
+
+    by_phase = defaultdict(bucket)
+    by_endpoint = defaultdict(bucket)
+    by_model = defaultdict(bucket)
+
+    for entry in entries:
+        for totals in (
+            by_phase[entry.get("phase") or "untagged"],
+            by_endpoint[entry["endpoint_model"]],
+            by_model[entry.get("model") or "untagged"]
+        ):
+            totals["calls"] += 1
+            totals["cache_hits"] += int(entry.get("response_cache_hit", False))
+            totals["prompt_tokens"] += entry["prompt_tokens"]
+            totals["completion_tokens"] += entry["completion_tokens"]
+            totals["cached_tokens"] += entry["cached_tokens"]
+            totals["latency_ms"] += entry.get("latency_ms") or 0.0
+            if entry["cost_usd"] is None:
+                totals["unpriced_calls"] += 1
+            else:
+                totals["cost_usd"] += entry["cost_usd"]
+
+    # Collection, user-turn and judge spend is attributed to the model under test;
+    # points count only the conversations that appear in these entries
+    seen = {(e.get("model"), e.get("scenario_id")) for e in entries}
+    points = defaultdict(float)
+    for evaluation in evaluations:
+        if (evaluation["model"], evaluation["scenario_id"]) in seen:
+            points[evaluation["model"]] += sum(evaluation["scores"].values())
+    for model, totals in by_model.items():
+        totals["score_points"] = points.get(model, 0.0)
+        totals["cost_per_point"] = totals["cost_usd"] / points[model] if points.get(model) else None
+
+    return {"phases": dict(by_phase), "endpoints": dict(by_endpoint), "models": dict(by_model)}
+
+
+def _print_table(title: str, rows: Dict[str, Dict[str, Any]], extra: bool = False):
+    print(f"\n{title}")
+    header = f"  {'':<22}{'calls':>7}{'cached':>8}{'prompt':>11}{'completion':>12}{'cost $':>10}{'avg ms':>9}"
+    if extra:
+        header += f"{'$/point':>10}"
+    print(header)
+    for name, t in sorted(rows.items(), key=lambda item: -item[1]["cost_usd"]):
+        live_calls = t["calls"] - t["cache_hits"]
+        avg_latency = t["latency_ms"] / live_calls if live_calls else 0.0
+        cost = f"{t['cost_usd']:.4f}" + ("*" if t["unpriced_calls"] else "")
+        line = (f"  {name:<22}{t['calls']:>7}{t['cache_hits']:>8}{t['prompt_tokens']:>11}"
+                f"{t['completion_tokens']:>12}{cost:>10}{avg_latency:>9.0f}")
+        if extra:
+            per_point = t.get("cost_per_point")
+            line += f"{per_point:>10.5f}" if per_point is not None else f"{'-':>10}"
+        print(line)
+
+
+def main():
+    """Report token usage and cost from the usage ledger"""
+    parser = argparse.ArgumentParser(description="Summarize data/usage.jsonl by phase, endpoint and test model")
+    parser.add_argument("--run", help="Only runs whose id starts with this, e.g. a timestamp covering "
+                                      "all workers of a run ('latest' for the most recent run)")
+    parser.add_argument("--evaluations", default="data/evaluations.json")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    args = parser.parse_args()
+
+    with open(CONFIG_PATH, "r") as f:
+        config = yaml.safe_load(f)
+    path = Path(config.get("usage", {}).get("ledger_path", "data/usage.jsonl"))
+
+    entries = list(load_entries(path))
+    if not entries:
+        print(f"No usage recorded in {path}")
+        return
+
+    if args.run:
+        run_id = entries[-1]["run_id"] if args.run == "latest" else args.run
+        entries = [e for e in entries if e["run_id"].startswith(run_id)]
+
+    evaluations = []
+    if os.path.exists(args.evaluations):
+        with open(args.evaluations, "r") as f:
+            evaluations = json.load(f)
+
+    summary = summarize(entries, evaluations)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+
+    runs = sorted({e["run_id"] for e in entries})
+    print(f"=== Usage report: {len(entries)} calls across {len(runs)} run(s) ===")
+    _print_table("By phase", summary["phases"])
+    _print_table("By queried model", summary["endpoints"])
+    _print_table("By model under test (collect + user-turn + judge)", summary["models"], extra=True)
+
+    if any(t["unpriced_calls"] for t in summary["endpoints"].values()):
+        print("\n* includes calls to models without a pricing entry in config/models.yaml (counted as $0)")
+
+
+if __name__ == "__main__":
+    main()
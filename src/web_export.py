@@ -0,0 +1,87 @@
+import json
+import gzip
+import math
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, Any, List, Iterable
+
+try:
+    import brotli
+except ImportError:  # .br variants are skipped without the optional brotli package
+    brotli = None
+
+
+def _clean(value: Any) -> Any:
+    """NaN is not valid JSON; publish it as null"""
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, dict):
+        return {k: _clean(v) for k, v in value.items()}
+    return value
+
+
+def write_compressed(path: Path, raw: bytes):
+    """Write precompressed .gz (and .br) siblings of a file's bytes"""
+    Path(f"{path}.gz").write_bytes(gzip.compress(raw, compresslevel=9, mtime=0))
+    if brotli is not None:
+        Path(f"{path}.br").write_bytes(brotli.compress(raw, quality=11))
+    else:
+        # A .br left by an earlier export would be served instead of the new data
+        Path(f"{path}.br").unlink(missing_ok=True)
+
+
+def write_bundle(path: Path, data: Any) -> int:
+    """Write compact JSON plus precompressed siblings; returns the raw size"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    raw = json.dumps(data, separators=(",", ":"), default=str).encode("utf-8")
+    path.write_bytes(raw)
+    write_compressed(path, raw)
+    return len(raw)
+
+
+def export_web_bundles(
+    category_averages: Dict[str, Dict[str, Dict[str, float]]],
+    evaluations: Iterable[Dict[str, Any]],
+    dimensions: List[str],
+    out_dir: Path = Path("docs/data")
+) -> Dict[str, int]:
+    """Write the docs site's precomputed aggregates and per-scenario evaluation shards
+
+    - aggregates.json: category x model x dimension means, loaded on first paint
+    - evaluations/<scenario_id>.json: every model's evaluation for one scenario,
+      fetched by the chat view when that scenario is opened; shards of
+      scenarios that are no longer exported are removed
+    """
+    out_dir = Path(out_dir)
+
+    aggregates = {
+        "dimensions": dimensions,
+        "categories": _clean(category_averages),
+        "generated_at": str(datetime.now())
+    }
+    sizes = {"aggregates.json": write_bundle(out_dir / "aggregates.json", aggregates)}
+
+    shards: Dict[str, List[Dict[str, Any]]] = {}
+    for evaluation in evaluations:
+        shards.setdefault(evaluation["scenario_id"], []).append(evaluation)
+
+    shard_dir = out_dir / "evaluations"
+    for scenario_id, scenario_evaluations in shards.items():
+        sizes[f"evaluations/{scenario_id}.json"] = write_bundle(
+            shard_dir / f"{scenario_id}.json", scenario_evaluations
+        )
+
+    # Drop shards (and their .gz/.br) of scenarios no longer in the export
+    current = {f"{scenario_id}.json" for scenario_id in shards}
+    if shard_dir.exists():
+        for path in shard_dir.iterdir():
+            name = path.name.removesuffix(".gz").removesuffix(".br")
+            if path.is_file() and name not in current:
+                path.unlink()
+
+    # The summary is also fetched on first paint
+    summary_path = out_dir / "summary.json"
+    if summary_path.exists():
+        write_compressed(summary_path, summary_path.read_bytes())
+
+    return sizes
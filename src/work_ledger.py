@@ -0,0 +1,373 @@
+import os
+import sys
+import time
+import zlib
+import socket
+import sqlite3
+import asyncio
+import threading
+import argparse
+import subprocess
+from pathlib import Path
+from typing import Dict, Any, List, Iterable, Optional, Tuple, Callable, Awaitable
+import yaml
+
+try:
+    from usage_ledger import BudgetExceeded
+except ImportError:
+    from src.usage_ledger import BudgetExceeded
+
+CONFIG_PATH = Path(__file__).parent.parent / "config" / "models.yaml"
+SHARD_BUCKETS = 1024
+
+Unit = Tuple[str, str]  # (model, scenario_id)
+
+
+def load_work_config(config_path: Path = CONFIG_PATH) -> Dict[str, Any]:
+    with open(config_path, "r") as f:
+        return yaml.safe_load(f).get("work_ledger", {})
+
+
+def parse_shard(value: Optional[str]) -> Optional[Tuple[int, int]]:
+    """'I/N' (1-based, e.g. 2/4) -> (I - 1, N)"""
+    if not value:
+        return None
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"--shard must look like I/N, got {value!r}")
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"--shard index must be between 1 and {count}, got {index}")
+    return index - 1, count
+
+
+class WorkLedger:
+    """Shared SQLite table of scenario x model work units, handed out under leases
+
+    Units move pending -> leased -> done. A leased unit belongs to one worker
+    until its lease expires; workers extend their leases with heartbeats
+    while a unit is in progress, so a crashed or killed worker's units go
+    back to the pool after `lease_seconds` and are retried by whoever claims
+    them next. Units that fail `max_attempts` times are marked failed.
+
+    Every process (and machine, with the file on a shared filesystem) that
+    opens the same path shares the queue. The rollback journal is used
+    instead of WAL because WAL needs shared memory and does not work
+    across network filesystems.
+    """
+
+    def __init__(
+        self,
+        phase: str,
+        path: Optional[str] = None,
+        lease_seconds: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+        worker_id: Optional[str] = None
+    ):
+        config = load_work_config()
+        self.phase = phase
+        self.path = Path(path or config.get("path", "data/work/ledger.sqlite"))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease_seconds = lease_seconds or config.get("lease_seconds", 300.0)
+        self.max_attempts = max_attempts or config.get("max_attempts", 3)
+        self.poll_interval = config.get("poll_interval", 5.0)
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+
+        # isolation_level=None: transactions are managed explicitly below.
+        # drain() runs queries in worker threads (see _run), serialized by _lock
+        self._conn = sqlite3.connect(
+            str(self.path), timeout=60.0, isolation_level=None, check_same_thread=False
+        )
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=DELETE")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS units (
+                phase TEXT NOT NULL,
+                model TEXT NOT NULL,
+                scenario_id TEXT NOT NULL,
+                bucket INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                worker TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (phase, model, scenario_id)
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_units_status ON units(phase, status, bucket)"
+        )
+
+    @staticmethod
+    def bucket(model: str, scenario_id: str) -> int:
+        """Stable bucket of a unit; shard I of N owns the buckets with bucket % N == I"""
+        return zlib.crc32(f"{model}/{scenario_id}".encode("utf-8")) % SHARD_BUCKETS
+
+    def seed(self, units: Iterable[Unit], is_done: Callable[[str, str], bool]) -> int:
+        """Register units (idempotent) and sync their done state with `is_done`; returns new units
+
+        Units whose output has disappeared since they were marked done (e.g.
+        a deleted evaluations.jsonl) go back to the pool with fresh attempts.
+        """
+        now = time.time()
+        rows = []
+        done = []
+        undone = []
+        for model, scenario_id in units:
+            rows.append((self.phase, model, scenario_id, self.bucket(model, scenario_id), now))
+            if is_done(model, scenario_id):
+                done.append((now, self.phase, model, scenario_id))
+            else:
+                undone.append((now, self.phase, model, scenario_id))
+
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO units (phase, model, scenario_id, bucket, updated_at) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            added = self._conn.total_changes - before
+            self._conn.executemany(
+                "UPDATE units SET status = 'done', worker = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE phase = ? AND model = ? AND scenario_id = ? AND status != 'done'",
+                done
+            )
+            self._conn.executemany(
+                "UPDATE units SET status = 'pending', attempts = 0, last_error = NULL, updated_at = ? "
+                "WHERE phase = ? AND model = ? AND scenario_id = ? AND status = 'done'",
+                undone
+            )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return added
+
+    def _shard_clause(self, shard: Optional[Tuple[int, int]]) -> Tuple[str, tuple]:
+        if shard is None:
+            return "", ()
+        index, count = shard
+        return " AND bucket % ? = ?", (count, index)
+
+    def claim(self, shard: Optional[Tuple[int, int]] = None) -> Optional[Unit]:
+        """Lease the next pending (or expired) unit to this worker, or None if there is none"""
+        now = time.time()
+        clause, params = self._shard_clause(shard)
+
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Expired leases with no attempts left will not be claimed again
+            self._conn.execute(
+                "UPDATE units SET status = 'failed', worker = NULL, last_error = 'lease expired', updated_at = ? "
+                "WHERE phase = ? AND status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, self.phase, now, self.max_attempts)
+            )
+            row = self._conn.execute(
+                "SELECT model, scenario_id FROM units WHERE phase = ? AND attempts < ? AND "
+                "(status = 'pending' OR (status = 'leased' AND lease_expires < ?))" + clause +
+                " ORDER BY attempts, scenario_id, model LIMIT 1",
+                (self.phase, self.max_attempts, now) + params
+            ).fetchone()
+            if row is not None:
+                self._conn.execute(
+                    "UPDATE units SET status = 'leased', worker = ?, lease_expires = ?, "
+                    "attempts = attempts + 1, updated_at = ? WHERE phase = ? AND model = ? AND scenario_id = ?",
+                    (self.worker_id, now + self.lease_seconds, now, self.phase, row[0], row[1])
+                )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return (row[0], row[1]) if row is not None else None
+
+    def _update_own(self, unit: Unit, assignments: str, params: tuple) -> bool:
+        cursor = self._conn.execute(
+            f"UPDATE units SET {assignments}, updated_at = ? "
+            "WHERE phase = ? AND model = ? AND scenario_id = ? AND worker = ? AND status = 'leased'",
+            params + (time.time(), self.phase, unit[0], unit[1], self.worker_id)
+        )
+        return cursor.rowcount == 1
+
+    def heartbeat(self, unit: Unit) -> bool:
+        """Extend this worker's lease; False if the lease was lost (expired and re-claimed)"""
+        return self._update_own(unit, "lease_expires = ?", (time.time() + self.lease_seconds,))
+
+    def complete(self, unit: Unit) -> bool:
+        """Mark the unit done; False if the lease was lost before it finished"""
+        return self._update_own(unit, "status = 'done', worker = NULL, lease_expires = NULL, last_error = NULL", ())
+
+    def fail(self, unit: Unit, error: str) -> bool:
+        """Return the unit to the pool, or mark it failed after max_attempts; False if the lease was lost"""
+        return self._update_own(
+            unit,
+            "status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "worker = NULL, lease_expires = NULL, last_error = ?",
+            (self.max_attempts, error[:500])
+        )
+
+    def release(self, unit: Unit):
+        """Give a unit back without counting the attempt (e.g. the run was stopped)"""
+        self._update_own(unit, "status = 'pending', worker = NULL, lease_expires = NULL, attempts = attempts - 1", ())
+
+    def outstanding(self, shard: Optional[Tuple[int, int]] = None) -> int:
+        """Units other workers hold under live leases (they may still come back to the pool)"""
+        clause, params = self._shard_clause(shard)
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM units WHERE phase = ? AND status = 'leased' AND lease_expires >= ?" + clause,
+            (self.phase, time.time()) + params
+        ).fetchone()[0]
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._conn.execute(
+            "SELECT status, COUNT(*) FROM units WHERE phase = ? GROUP BY status", (self.phase,)
+        ).fetchall()
+        return dict(rows)
+
+    def failed_units(self) -> List[Tuple[str, str, Optional[str]]]:
+        """(model, scenario_id, last error) of units that ran out of attempts"""
+        return self._conn.execute(
+            "SELECT model, scenario_id, last_error FROM units WHERE phase = ? AND status = 'failed' "
+            "ORDER BY model, scenario_id",
+            (self.phase,)
+        ).fetchall()
+
+    def retry_failed(self) -> int:
+        """Put failed units back in the pool with fresh attempts"""
+        cursor = self._conn.execute(
+            "UPDATE units SET status = 'pending', attempts = 0, updated_at = ? WHERE phase = ? AND status = 'failed'",
+            (time.time(), self.phase)
+        )
+        return cursor.rowcount
+
+    def close(self):
+        self._conn.close()
+
+    def _locked(self, method: Callable[..., Any], *args) -> Any:
+        with self._lock:
+            return method(*args)
+
+    async def _run(self, method: Callable[..., Any], *args) -> Any:
+        """Call a ledger method in a thread so lock waits on the shared file do not block the event loop"""
+        return await asyncio.to_thread(self._locked, method, *args)
+
+    async def _keep_alive(self, unit: Unit):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not await self._run(self.heartbeat, unit):
+                print(f"  ⚠️  Lease on {unit[0]} - {unit[1]} was lost; another worker may redo it")
+                return
+
+    async def drain(
+        self,
+        handle: Callable[[str, str], Awaitable[Any]],
+        concurrency: int = 1,
+        shard: Optional[Tuple[int, int]] = None
+    ) -> Dict[str, int]:
+        """Claim and process units until none are left for this shard
+
+        Runs `concurrency` units at a time. While no unit is claimable but
+        other workers still hold leases, polls in case one of them dies and
+        its units expire. A BudgetExceeded from `handle` stops this worker
+        and returns its unit to the pool. Units whose lease was lost while
+        they ran are counted as "lost" rather than done or failed.
+        """
+        results = {"done": 0, "failed": 0, "lost": 0}
+        stop: List[BudgetExceeded] = []
+
+        async def worker():
+            while not stop:
+                unit = await self._run(self.claim, shard)
+                if unit is None:
+                    if await self._run(self.outstanding, shard) == 0:
+                        return
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+
+                heartbeat = asyncio.create_task(self._keep_alive(unit))
+                try:
+                    await handle(*unit)
+                except BudgetExceeded as e:
+                    await self._run(self.release, unit)
+                    stop.append(e)
+                except Exception as e:
+                    if await self._run(self.fail, unit, f"{type(e).__name__}: {e}"):
+                        results["failed"] += 1
+                        print(f"  ✗ {unit[0]} - {unit[1]} failed: {e}")
+                    else:
+                        results["lost"] += 1
+                else:
+                    if await self._run(self.complete, unit):
+                        results["done"] += 1
+                    else:
+                        results["lost"] += 1
+                        print(f"  ⚠️  {unit[0]} - {unit[1]} finished after its lease was lost; not marked done")
+                finally:
+                    heartbeat.cancel()
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        if stop:
+            print(f"\n💸 Budget reached, worker stopped: {stop[0]}")
+        if results["lost"]:
+            print(f"\n⚠️  {results['lost']} unit(s) lost their lease mid-run; another worker owns them now")
+        return results
+
+
+def spawn_workers(script: str, argv: List[str], workers: int) -> int:
+    """Run `workers` copies of a script as ledger workers and wait for them
+
+    Each child gets the parent's arguments with --workers replaced by
+    --worker-process, so it claims units instead of spawning. Returns the
+    number of children that exited with an error.
+    """
+    child_argv = []
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+            continue
+        if arg == "--workers":
+            skip = True
+            continue
+        if arg.startswith("--workers="):
+            continue
+        child_argv.append(arg)
+
+    children = [
+        subprocess.Popen([sys.executable, script, *child_argv, "--worker-process"])
+        for _ in range(workers)
+    ]
+    failures = 0
+    try:
+        for child in children:
+            failures += child.wait() != 0
+    except KeyboardInterrupt:
+        for child in children:
+            child.terminate()
+        raise
+    return failures
+
+
+def main():
+    """Show or reset the work ledger"""
+    parser = argparse.ArgumentParser(description="Inspect the shared work ledger")
+    parser.add_argument("phase", choices=["collect", "evaluate"])
+    parser.add_argument("--retry-failed", action="store_true", help="Return failed units to the pool")
+    args = parser.parse_args()
+
+    ledger = WorkLedger(args.phase)
+    if args.retry_failed:
+        print(f"↩️  {ledger.retry_failed()} failed units returned to the pool")
+    counts = ledger.counts()
+    if not counts:
+        print(f"No {args.phase} units in {ledger.path}")
+    else:
+        print(f"{args.phase}: " + ", ".join(f"{status} {n}" for status, n in sorted(counts.items())))
+    for model, scenario_id, error in ledger.failed_units():
+        print(f"  ✗ {model} - {scenario_id}: {error}")
+    ledger.close()
+
+
+if __name__ == "__main__":
+    main()